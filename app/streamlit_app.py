@@ -11,7 +11,7 @@ from streamlit_folium import st_folium
 
 __version__ = version("nlr-psm3-2-epw")
 
-from nlr_psm3_2_epw.assets import download_epw
+from nlr_psm3_2_epw.assets import epw_file_name, fetch_epw
 from nlr_psm3_2_epw.constants import DEVELOPER_DOCS_URL, DEVELOPER_SIGNUP_URL
 
 # --- CONSTANTS ---
@@ -328,7 +328,8 @@ def main():
     ):
         with st.spinner("Requesting data from NLR..."):
             try:
-                file_name = download_epw(
+                # Build the EPW in memory so concurrent sessions never race on a file in the working directory
+                weather = fetch_epw(
                     lon,
                     lat,
                     year,
@@ -344,6 +345,7 @@ def main():
                     MAILING_LIST,
                     LEAP_YEAR,
                 )
+                s = weather.to_bytes(fixed_precision=True)
             except Exception as exc:
                 st.error(f"Request failed: {exc}")
                 if api_key_source == "default":
@@ -352,42 +354,38 @@ def main():
                     )
                 st.stop()
 
-        if os.path.exists(file_name):
-            file_size_mb = os.path.getsize(file_name) / (1024 * 1024)
-            with open(file_name, "rb") as f:
-                s = f.read()
-                st.success(
-                    f"Data successfully processed! Your EPW file (**{os.path.basename(file_name)}**) is ready for download ({file_size_mb:.2f} MB)."
-                )
+        file_name = epw_file_name(location, lat, lon, year)
+        file_size_mb = len(s) / (1024 * 1024)
+        st.success(
+            f"Data successfully processed! Your EPW file (**{file_name}**) is ready for download ({file_size_mb:.2f} MB)."
+        )
 
-                with st.expander("👀 Preview File Contents (First 10 Lines)"):
-                    # Bolt Optimization:
-                    # By splitting on the raw byte string `s` with maxsplit=10 *before* decoding,
-                    # we avoid completely decoding the entire 2.5MB+ file into memory and allocating
-                    # an 8760+ element list just to extract the first 10 lines.
-                    preview_lines = b"\n".join(s.split(b"\n", 10)[:10]).decode("utf-8", errors="replace")
-                    st.code(preview_lines, language="csv")
-
-                st.download_button(
-                    label="Download EPW",
-                    data=s,
-                    file_name=file_name,
-                    mime="text/plain",
-                    type="primary",
-                    icon=":material/download:",
-                    use_container_width=True,
-                )
+        with st.expander("👀 Preview File Contents (First 10 Lines)"):
+            # Bolt Optimization:
+            # By splitting on the raw byte string `s` with maxsplit=10 *before* decoding,
+            # we avoid completely decoding the entire 2.5MB+ file into memory and allocating
+            # an 8760+ element list just to extract the first 10 lines.
+            preview_lines = b"\n".join(s.split(b"\n", 10)[:10]).decode("utf-8", errors="replace")
+            st.code(preview_lines, language="csv")
+
+        st.download_button(
+            label="Download EPW",
+            data=s,
+            file_name=file_name,
+            mime="text/plain",
+            type="primary",
+            icon=":material/download:",
+            use_container_width=True,
+        )
 
-            st.markdown("---")
-            st.info(
-                "**Visualize your EPW file**\n\n"
-                "Once downloaded, you can visualize your EPW file using these free online tools:\n\n"
-                "- **[EPWvis](https://mdahlhausen.github.io/epwvis/)**: View summary charts and graphs for temperature, radiation, and wind.\n"
-                "- **[CBE Clima Tool](https://clima.cbe.berkeley.edu/)**: Advanced interactive climate analysis and psychrometric charts.",
-                icon="📊",
-            )
-        else:
-            st.error("Please make sure that NLR is able to deliver data for the location and year you provided.")
+        st.markdown("---")
+        st.info(
+            "**Visualize your EPW file**\n\n"
+            "Once downloaded, you can visualize your EPW file using these free online tools:\n\n"
+            "- **[EPWvis](https://mdahlhausen.github.io/epwvis/)**: View summary charts and graphs for temperature, radiation, and wind.\n"
+            "- **[CBE Clima Tool](https://clima.cbe.berkeley.edu/)**: Advanced interactive climate analysis and psychrometric charts.",
+            icon="📊",
+        )
         st.stop()
 
 
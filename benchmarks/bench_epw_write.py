@@ -0,0 +1,76 @@
+"""Compares the default `EPW.write` (pandas `.to_csv()`) with the fixed-precision writer.
+
+Run with `uv run python benchmarks/bench_epw_write.py`.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from nlr_psm3_2_epw import epw  # noqa: E402
+from nlr_psm3_2_epw.constants import DEFAULT_HEADERS  # noqa: E402
+
+
+def synthetic_epw(hours: int = 8760, seed: int = 0) -> epw.EPW:
+    """Builds an hourly EPW with NSRDB-like float noise in the measured columns."""
+    rng = np.random.default_rng(seed)
+    frame = {name: np.full(hours, 9999) for name in epw.COLUMNS}
+    index = pd.date_range("2012-01-01", periods=hours, freq="h")
+    frame.update(
+        {
+            "Year": index.year.values,
+            "Month": index.month.values,
+            "Day": index.day.values,
+            "Hour": index.hour.values + 1,
+            "Minute": np.zeros(hours, dtype=int),
+            "Data Source and Uncertainty Flags": "'Created with NLR PSM v4 input data'",
+            "Dry Bulb Temperature": rng.normal(15, 10, hours),
+            "Dew Point Temperature": rng.normal(5, 8, hours),
+            "Relative Humidity": rng.uniform(10, 100, hours),
+            "Atmospheric Station Pressure": rng.integers(950, 1050, hours) * 100,
+            "Global Horizontal Radiation": rng.uniform(0, 1000, hours),
+            "Direct Normal Radiation": rng.uniform(0, 1000, hours),
+            "Diffuse Horizontal Radiation": rng.uniform(0, 400, hours),
+            "Wind Direction": rng.uniform(0, 360, hours),
+            "Wind Speed": rng.uniform(0, 15, hours),
+            "Present Weather Observation": "",
+            "Present Weather Codes": "",
+            "Precipitable Water": rng.uniform(0, 5, hours),
+            "Aerosol Optical Depth": 0.999,
+            "Albedo": rng.uniform(0.1, 0.3, hours),
+        }
+    )
+    out = epw.EPW()
+    out.headers = DEFAULT_HEADERS.copy()
+    out.dataframe = pd.DataFrame(frame, columns=epw.COLUMNS)
+    return out
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeat: int = 10) -> None:
+    out = synthetic_epw()
+    default_bytes = out.to_bytes()
+    fixed_bytes = out.to_bytes(fixed_precision=True)
+    default_s = _time(out.to_bytes, repeat)
+    fixed_s = _time(lambda: out.to_bytes(fixed_precision=True), repeat)
+
+    print(f"default writer : {default_s * 1000:8.1f} ms  {len(default_bytes) / 1024:8.0f} KiB")
+    print(f"fixed precision: {fixed_s * 1000:8.1f} ms  {len(fixed_bytes) / 1024:8.0f} KiB")
+    print(f"speedup {default_s / fixed_s:.1f}x, size {len(fixed_bytes) / len(default_bytes):.0%} of default")
+
+
+if __name__ == "__main__":
+    main()
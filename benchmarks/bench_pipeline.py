@@ -0,0 +1,253 @@
+"""Times and memory-profiles every stage of the NSRDB CSV to EPW pipeline on synthetic responses.
+
+Each case is a realistic NSRDB response (hourly, 30-minute or 5-minute; single year or TMY). For every
+case the stages are measured separately:
+
+- download: `download_epw` end to end, with the HTTP layer stubbed to return the response
+- parse: `assets._parse_response`, the two `pd.read_csv` calls
+- transform: `assets._build_epw`, the mapping onto the EPW frame
+- write: `EPW.write(..., fixed_precision=True)` to an in-memory stream
+- read: `EPW.read` of the written file
+
+Each stage reports its best wall time over `--repeat` runs and its peak traced memory. Run with
+
+    uv run python benchmarks/bench_pipeline.py --output results.json
+    uv run python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json --threshold 0.5
+
+With `--baseline` the run fails if any stage got slower, or needs more memory, than the baseline by more
+than the threshold and by more than an absolute noise floor (`--min-seconds`, `--min-bytes`). Use `--update-baseline` to record a new baseline on the reference machine.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from nlr_psm3_2_epw import assets, epw, transport  # noqa: E402
+
+METADATA = (
+    "Source,Location ID,City,State,Country,Latitude,Longitude,Time Zone,Elevation,Local Time Zone\n"
+    "NSRDB,1234567,-,-,-,39.74,-105.18,-7,1829,-7\n"
+)
+DATA_HEADER = (
+    "Year,Month,Day,Hour,Minute,Temperature,Dew Point,Relative Humidity,Pressure,GHI,DNI,DHI,"
+    "Wind Direction,Wind Speed,Cloud Type,Precipitable Water,Surface Albedo\n"
+)
+
+# (name, interval in minutes, TMY)
+CASES = [
+    ("hourly-2012", 60, False),
+    ("30min-2012", 30, False),
+    ("5min-2012", 5, False),
+    ("hourly-tmy", 60, True),
+]
+
+STAGES = ("download", "parse", "transform", "write", "read")
+
+# Differences below these are within the run-to-run noise of millisecond-scale stages and never count as regressions
+NOISE_FLOOR = {"seconds": 0.005, "peak_bytes": 256 * 1024}
+
+
+def synthetic_nsrdb_csv(
+    interval: int = 60, tmy: bool = False, days: int = 365, seed: int = 0, year: int = 2011
+) -> bytes:
+    """Builds an NSRDB CSV response with a diurnal irradiance cycle and NSRDB-like noise.
+
+    A TMY response takes every month from a different year, like the real typical-year datasets.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{year}-01-01", periods=days * 24 * 60 // interval, freq=f"{interval}min")
+    rows = len(index)
+    years = np.full(rows, year)
+    if tmy:
+        years = rng.integers(1998, 2021, 12)[index.month.values - 1]
+    hour = index.hour.values + index.minute.values / 60
+    daylight = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None)
+    ghi = np.round(daylight * rng.uniform(600, 1000, rows)).astype(int)
+    frame = pd.DataFrame(
+        {
+            "Year": years,
+            "Month": index.month.values,
+            "Day": index.day.values,
+            "Hour": index.hour.values,
+            "Minute": index.minute.values,
+            "Temperature": np.round(rng.normal(12, 9, rows), 1),
+            "Dew Point": np.round(rng.normal(0, 7, rows), 1),
+            "Relative Humidity": np.round(rng.uniform(10, 100, rows), 2),
+            "Pressure": rng.integers(800, 830, rows),
+            "GHI": ghi,
+            "DNI": np.round(ghi * rng.uniform(0.5, 1.1, rows)).astype(int),
+            "DHI": np.round(ghi * rng.uniform(0.1, 0.4, rows)).astype(int),
+            "Wind Direction": np.round(rng.uniform(0, 360, rows)).astype(int),
+            "Wind Speed": np.round(rng.gamma(2, 1.5, rows), 1),
+            "Cloud Type": rng.integers(0, 10, rows),
+            "Precipitable Water": np.round(rng.uniform(0.2, 3, rows), 1),
+            "Surface Albedo": np.round(rng.uniform(0.1, 0.3, rows), 2),
+        }
+    )
+    return (METADATA + DATA_HEADER).encode() + frame.to_csv(index=False, header=False).encode()
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Returns the best wall time over `repeat` runs and the peak traced memory of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    # Tracing slows the run down, so memory is measured in a separate, untimed run
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run_case(content: bytes, interval: int, tmy: bool, repeat: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    """Measures every stage for one synthetic response."""
+    year = "tmy-2022" if tmy else 2012
+    args = (-105.18, 39.74, year, "Bench", "ghi", str(interval), "false", "Name", "key", "reason", "aff", "a@b.c")
+    metadata, df = assets._parse_response(content)
+    out = assets._build_epw(metadata, df, "Bench", 39.74, -105.18)
+    path = os.path.join(workdir, "bench.epw")
+    out.write(path, fixed_precision=True)
+
+    previous = assets.set_transport(transport.StubTransport(lambda *_args: content))
+    try:
+        results = {
+            "download": measure(lambda: assets.download_epw(*args, "false", "false", output_dir=workdir), repeat),
+        }
+    finally:
+        assets.set_transport(previous)
+    results["parse"] = measure(lambda: assets._parse_response(content), repeat)
+    results["transform"] = measure(lambda: assets._build_epw(metadata, df, "Bench", 39.74, -105.18), repeat)
+    results["write"] = measure(lambda: out.write(io.StringIO(), fixed_precision=True), repeat)
+    results["read"] = measure(lambda: epw.EPW().read(path), repeat)
+    return results
+
+
+def run(repeat: int = 5, days: int = 365, cases: Optional[List[Tuple[str, int, bool]]] = None) -> Dict[str, Any]:
+    """Runs every case and returns the results with the environment they were measured in."""
+    results: Dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, interval, tmy in cases or CASES:
+            content = synthetic_nsrdb_csv(interval, tmy, days)
+            # `download_epw` prints a line per file, which would drown the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                stages = run_case(content, interval, tmy, repeat, workdir)
+            results["cases"][name] = {"rows": content.count(b"\n") - 3, "bytes": len(content), "stages": stages}
+    return results
+
+
+def regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    noise_floor: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """Lists every stage that is slower, or peaks higher, than the baseline by more than `threshold`.
+
+    A stage only regresses if it is also worse by more than the absolute `noise_floor` of the metric
+    (`NOISE_FLOOR` by default), so a 2 ms stage that takes 3 ms in a noisy run is not reported.
+    """
+    floor = NOISE_FLOOR if noise_floor is None else noise_floor
+    found = []
+    for case, current in results["cases"].items():
+        reference = baseline["cases"].get(case)
+        if reference is None:
+            continue
+        for stage, values in current["stages"].items():
+            before = reference["stages"].get(stage)
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                excess = values[metric] - before[metric]
+                if values[metric] > before[metric] * (1 + threshold) and excess > floor[metric]:
+                    found.append(
+                        f"{case} {stage} {metric}: {values[metric]:.6g} vs baseline {before[metric]:.6g} "
+                        f"(+{values[metric] / before[metric] - 1:.0%})"
+                    )
+    return found
+
+
+def report(results: Dict[str, Any]) -> str:
+    """Formats the results as a table."""
+    lines = [f"{'case':<12} {'rows':>7}  " + "  ".join(f"{stage:>18}" for stage in STAGES)]
+    for case, values in results["cases"].items():
+        cells = [
+            f"{values['stages'][stage]['seconds'] * 1000:8.1f} ms {values['stages'][stage]['peak_bytes'] / 2**20:5.1f} MiB"
+            for stage in STAGES
+        ]
+        lines.append(f"{case:<12} {values['rows']:>7}  " + "  ".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the best one is reported.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare the results with this JSON baseline.")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed relative slowdown [default: 0.5].")
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=NOISE_FLOOR["seconds"],
+        help="Ignore slowdowns of less than this many seconds [default: 0.005].",
+    )
+    parser.add_argument(
+        "--min-bytes",
+        type=int,
+        default=NOISE_FLOOR["peak_bytes"],
+        help="Ignore memory increases of less than this many bytes [default: 262144].",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline instead.")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(report(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(
+            results, baseline, args.threshold, {"seconds": args.min_seconds, "peak_bytes": args.min_bytes}
+        )
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print(f"No stage regressed by more than {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Pushes `download_epw_batch` against the mock NSRDB server at increasing concurrency.
+
+Every level downloads `--requests` distinct site-years (so neither the response cache nor request
+coalescing hides any work) over a real HTTP connection pool, and reports the throughput and the
+p50/p95/p99 latency of the requests. Use it to size worker counts, connection pools and rate limits
+without spending API quota:
+
+    uv run python benchmarks/load_test.py --concurrency 1 2 4 8 16 --requests 64 --latency 0.5
+    uv run python benchmarks/load_test.py --rate-limit 5 --throttle-rate 5 --failure-rate 0.02
+
+By default a mock server is started in-process with the given fault options; `--url` targets a
+mock server that is already running instead.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit, urlunsplit
+
+import numpy as np
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mock_nsrdb import MockConfig, MockNSRDB  # noqa: E402
+from nlr_psm3_2_epw import assets, batch, throttle, transport  # noqa: E402
+
+OPTIONS = {
+    "attributes": "ghi,dhi,dni,wind_speed,air_temperature",
+    "utc": "false",
+    "your_name": "Load Test",
+    "api_key": "load-test",
+    "reason_for_use": "load test",
+    "your_affiliation": "-",
+    "your_email": "load@test.invalid",
+    "mailing_list": "false",
+    "leap_year": "false",
+}
+
+
+class RedirectTransport(transport.Transport):
+    """A `transport.Transport` that sends every request to `base_url` instead of the NLR host."""
+
+    def __init__(self, base_url: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.base_url = urlsplit(base_url)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        parts = urlsplit(url)
+        return super().request(
+            method, urlunsplit((self.base_url.scheme, self.base_url.netloc, parts.path, parts.query, "")), **kwargs
+        )
+
+
+def percentiles(latencies: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Returns the p50, p95 and p99 of the latencies, or None without any."""
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run_level(
+    concurrency: int,
+    requests_per_level: int,
+    interval: int,
+    output_dir: str,
+    start: int = 0,
+    throttle_rate: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Downloads `requests_per_level` distinct site-years with `concurrency` workers and summarizes them."""
+    specs = [
+        {"lon": -105 + (start + i) * 0.01, "lat": 39.74, "year": 2001 + i % 20, "location": f"Load{start + i}"}
+        for i in range(requests_per_level)
+    ]
+    common: Dict[str, Any] = dict(OPTIONS, interval=str(interval), output_dir=output_dir)
+    if throttle_rate is not None:
+        common["throttle"] = throttle.Throttle(
+            throttle.RateLimiter(rate=throttle_rate, burst=max(1, concurrency)), base_delay=0.1
+        )
+    began = time.perf_counter()
+    # `download_epw` prints a line per file, which would drown the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = list(batch.download_epw_batch(specs, max_workers=concurrency, **common))
+    wall = time.perf_counter() - began
+    latencies = [result.elapsed for result in results if result.ok]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": len(results) - len(latencies),
+        "seconds": wall,
+        "throughput": len(latencies) / wall,
+        **percentiles(latencies),
+    }
+
+
+def run(
+    concurrency: Sequence[int],
+    requests_per_level: int,
+    interval: int = 60,
+    url: Optional[str] = None,
+    config: MockConfig = MockConfig(),
+    throttle_rate: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Runs every concurrency level against a mock server and returns the summaries with the server's status counts."""
+    server = None if url is not None else MockNSRDB(config=config).start()
+    base_url = url if server is None else server.url
+    previous = assets.set_transport(RedirectTransport(base_url, max_connections_per_host=max(concurrency)))
+    levels = []
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            for index, workers in enumerate(concurrency):
+                levels.append(
+                    run_level(
+                        workers, requests_per_level, interval, output_dir, index * requests_per_level, throttle_rate
+                    )
+                )
+    finally:
+        assets.set_transport(previous).close()
+        if server is not None:
+            server.stop()
+    return {
+        "url": base_url,
+        "interval": interval,
+        "levels": levels,
+        "statuses": {} if server is None else {str(k): v for k, v in sorted(server.statuses.items())},
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def report(results: Dict[str, Any]) -> str:
+    """Formats the results as a table."""
+    lines = [f"{'workers':>7} {'ok':>5} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for level in results["levels"]:
+        lines.append(
+            f"{level['concurrency']:>7} {level['ok']:>5} {level['errors']:>6} {level['throughput']:>8.2f} "
+            f"{_ms(level['p50']):>8} {_ms(level['p95']):>8} {_ms(level['p99']):>8}"
+        )
+    if results["statuses"]:
+        lines.append("server responses: " + ", ".join(f"{k}: {v}" for k, v in results["statuses"].items()))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Worker counts to test.")
+    parser.add_argument("--requests", type=int, default=32, help="Downloads per concurrency level.")
+    parser.add_argument("--interval", type=int, default=60, help="The NSRDB interval in minutes.")
+    parser.add_argument("--url", help="A running mock server to use instead of starting one.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the mock server adds per response.")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random extra latency of up to this many seconds.")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second the mock server allows per API key.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of responses that are 503s.")
+    parser.add_argument("--days", type=int, default=365, help="Days per mock response.")
+    parser.add_argument("--throttle-rate", type=float, help="Client-side rate limit; enables retries of 429/5xx.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    config = MockConfig(args.latency, args.jitter, args.rate_limit, 0.0, args.failure_rate, args.days)
+    results = run(args.concurrency, args.requests, args.interval, args.url, config, args.throttle_rate)
+    print(report(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
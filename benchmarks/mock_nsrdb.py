@@ -0,0 +1,189 @@
+"""Serves deterministic NSRDB CSV responses locally, with injectable latency, rate limiting and failures.
+
+The server answers the routes of `GOES_AGGREGATED_URL` and `GOES_TMY_URL` with a synthetic response
+for the requested year, interval and point. The same request always gets the same data, and the
+injected faults are drawn from a seeded generator, so load tests are repeatable. Run with
+
+    uv run python benchmarks/mock_nsrdb.py --port 8080 --latency 0.5 --rate-limit 2 --failure-rate 0.01
+
+and point the package at it with `load_test.RedirectTransport` (see `benchmarks/load_test.py`).
+"""
+
+import argparse
+import functools
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_pipeline import synthetic_nsrdb_csv  # noqa: E402
+from nlr_psm3_2_epw.constants import GOES_AGGREGATED_URL, GOES_TMY_URL  # noqa: E402
+
+ROUTES = {urlsplit(GOES_AGGREGATED_URL).path: False, urlsplit(GOES_TMY_URL).path: True}
+
+
+class MockConfig(NamedTuple):
+    """How the mock server behaves.
+
+    Attributes:
+        latency (float): Seconds added before every response.
+        jitter (float): Up to this many seconds are added on top of `latency`, uniformly at random.
+        rate_limit (float | None): Requests per second allowed per API key, counted over the last
+            second. Requests beyond it get a 429 with a Retry-After header.
+        rate_limit_ratio (float): The share of the remaining requests answered with a 429 anyway.
+        failure_ratio (float): The share of the remaining requests answered with a 503.
+        days (int): The number of days in every response; 365 for full years.
+        seed (int): The seed of the injected faults.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit: Optional[float] = None
+    rate_limit_ratio: float = 0.0
+    failure_ratio: float = 0.0
+    days: int = 365
+    seed: int = 0
+
+
+@functools.lru_cache(maxsize=64)
+def _response(interval: int, tmy: bool, year: int, days: int, seed: int) -> bytes:
+    # Generating a 5-minute year takes longer than the request it stands for, so responses are reused
+    return synthetic_nsrdb_csv(interval, tmy, days, seed, year)
+
+
+def response_for(path: str, params: Dict[str, str], days: int = 365) -> bytes:
+    """Returns the deterministic response of a request: the same route and parameters give the same bytes."""
+    tmy = ROUTES[path]
+    interval = 60 if tmy else int(params.get("interval", 60))
+    names = params.get("names", "2020")
+    year = int(names) if names.isdigit() else 2020
+    seed = zlib.crc32(f"{path}|{names}|{interval}|{params.get('wkt', '')}".encode())
+    return _response(interval, tmy, year, days, seed)
+
+
+class MockNSRDB(ThreadingHTTPServer):
+    """A local NSRDB stand-in. Counts the responses it sent per status code in `statuses`."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0), config: MockConfig = MockConfig()) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.statuses: Counter = Counter()
+        self._random = random.Random(config.seed)
+        self._recent: Dict[str, Deque[float]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def decide(self, api_key: str) -> Tuple[int, float]:
+        """Returns the status code of the next request with an API key and the latency to add to it."""
+        config = self.config
+        with self._lock:
+            delay = config.latency + self._random.uniform(0, config.jitter)
+            status = 200
+            if config.rate_limit is not None:
+                now = time.monotonic()
+                recent = self._recent[api_key]
+                while recent and recent[0] <= now - 1:
+                    recent.popleft()
+                if len(recent) >= config.rate_limit:
+                    status = 429
+                else:
+                    recent.append(now)
+            draw = self._random.random()
+            if status == 200 and draw < config.rate_limit_ratio:
+                status = 429
+            elif status == 200 and draw < config.rate_limit_ratio + config.failure_ratio:
+                status = 503
+            self.statuses[status] += 1
+        return status, delay
+
+    def start(self) -> "MockNSRDB":
+        """Serves on a background thread and returns the server."""
+        threading.Thread(target=self.serve_forever, name="mock-nsrdb", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockNSRDB
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if parts.path not in ROUTES:
+            self._send(404, b'{"errors": ["Not found"]}', "application/json")
+            return
+        if not params.get("api_key"):
+            self._send(403, b'{"errors": ["No api_key was supplied"]}', "application/json")
+            return
+        status, delay = self.server.decide(params["api_key"])
+        if delay > 0:
+            time.sleep(delay)
+        if status == 429:
+            self._send(429, b'{"errors": ["Rate limit exceeded"]}', "application/json", {"Retry-After": "1"})
+        elif status == 503:
+            self._send(503, b'{"errors": ["Service unavailable"]}', "application/json")
+        else:
+            self._send(200, response_for(parts.path, params, self.server.config.days), "text/csv")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency of up to this many seconds.")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second allowed per API key.")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+    parser.add_argument("--days", type=int, default=365, help="Days per response.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        args.latency, args.jitter, args.rate_limit, args.rate_limit_ratio, args.failure_rate, args.days, args.seed
+    )
+    server = MockNSRDB((args.host, args.port), config)
+    print(f"Serving mock NSRDB on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Optional, Union
+
+from . import assets
+
+
+def _require_httpx() -> Any:
+    """Imports httpx, which is only needed for the asyncio client."""
+    try:
+        import httpx
+    except ImportError as exc:
+        raise ImportError(
+            "The asyncio client requires httpx. Install it with `pip install nlr-psm3-2-epw[async]`."
+        ) from exc
+    return httpx
+
+
+class AsyncDownloader:
+    """An asyncio counterpart to `assets.download_epw`.
+
+    HTTP requests run on a non-blocking httpx client and the number of requests in flight is
+    capped by a semaphore. The CSV-to-EPW conversion runs on an executor so that parsing and
+    writing never block the event loop. Use it as an async context manager, or call `aclose()`.
+
+    Args:
+        max_in_flight (int): The maximum number of concurrent NLR requests.
+        semaphore (asyncio.Semaphore | None): A semaphore shared with other downloaders. Overrides `max_in_flight`.
+        executor (Executor | None): The pool used for the CSV-to-EPW conversion. Defaults to the
+            event loop's default thread pool; pass a `ProcessPoolExecutor` to convert on other cores.
+        client (httpx.AsyncClient | None): The client used for requests. A client owned by the downloader
+            is created if not given.
+        timeout (float): The request timeout in seconds for the owned client.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        executor: Optional[Executor] = None,
+        client: Any = None,
+        timeout: float = 20,
+    ) -> None:
+        if semaphore is None:
+            if max_in_flight < 1:
+                raise ValueError("max_in_flight must be at least 1")
+            semaphore = asyncio.Semaphore(max_in_flight)
+        httpx = _require_httpx()
+        self._semaphore = semaphore
+        self._executor = executor
+        self._owns_client = client is None
+        self._client = httpx.AsyncClient(timeout=timeout) if client is None else client
+
+    async def __aenter__(self) -> "AsyncDownloader":
+        return self
+
+    async def __aexit__(self, *_exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the HTTP client if it is owned by this downloader."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def download_epw(
+        self,
+        lon: Union[str, float],
+        lat: Union[str, float],
+        year: Union[str, int],
+        location: str,
+        attributes: str,
+        interval: str,
+        utc: str,
+        your_name: str,
+        api_key: str,
+        reason_for_use: str,
+        your_affiliation: str,
+        your_email: str,
+        mailing_list: str,
+        leap_year: str,
+    ) -> str:
+        """
+        Downloads climate data from NLR and converts it to an EPW file without blocking the event loop.
+
+        Returns:
+            str: The filename of the created EPW file.
+        """
+        url, payload = assets._prepare_request(
+            lon,
+            lat,
+            year,
+            attributes,
+            interval,
+            utc,
+            your_name,
+            api_key,
+            reason_for_use,
+            your_affiliation,
+            your_email,
+            mailing_list,
+            leap_year,
+        )
+
+        async with self._semaphore:
+            r = await self._client.get(url, params=payload, headers=assets._REQUEST_HEADERS)
+        # Redact API key for safety before potentially logging payload/url in an error
+        payload["api_key"] = "REDACTED"
+
+        if not r.is_success:
+            raise assets._response_error(r, r.status_code, r.url)
+
+        loop = asyncio.get_running_loop()
+        file_name = await loop.run_in_executor(self._executor, assets._write_epw, r.content, location, lat, lon, year)
+        print("Success: File", file_name, "written")
+
+        return file_name
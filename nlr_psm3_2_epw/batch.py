@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, Tuple
+
+from . import assets
+
+
+class BatchResult(NamedTuple):
+    """The outcome of a single site/year request within a batch."""
+
+    index: int
+    spec: Mapping[str, Any]
+    file_name: Optional[str]
+    error: Optional[BaseException]
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run(spec: Mapping[str, Any], common: Mapping[str, Any]) -> Tuple[Optional[str], Optional[Exception], float]:
+    """Runs a single download with the per-site spec layered over the shared options and times it."""
+    kwargs = dict(common)
+    kwargs.update(spec)
+    start = time.perf_counter()
+    try:
+        file_name = assets.download_epw(**kwargs)
+    except Exception as exc:
+        return None, exc, time.perf_counter() - start
+    return file_name, None, time.perf_counter() - start
+
+
+def download_epw_batch(
+    specs: Iterable[Mapping[str, Any]],
+    max_workers: int = 8,
+    max_pending: Optional[int] = None,
+    **common: Any,
+) -> Iterator[BatchResult]:
+    """
+    Downloads many EPW files on a bounded thread pool, yielding results as they finish.
+
+    Each spec is a mapping of `download_epw` keyword arguments (typically `lon`, `lat`,
+    `year` and `location`) that is layered over the options shared by every request
+    (`attributes`, `api_key`, ...). All workers share the connection pool of the module-level
+    transport; for more than 32 workers, install a larger one with `assets.set_transport`.
+    Failures are reported per item instead of aborting the whole batch.
+
+    Args:
+        specs (Iterable[Mapping[str, Any]]): The per-site request specs. Consumed lazily.
+        max_workers (int): The number of concurrent downloads.
+        max_pending (int | None): The maximum number of submitted but unfinished requests.
+            Defaults to twice `max_workers`, which keeps memory bounded for very long inputs.
+        **common: Keyword arguments passed to every `download_epw` call.
+
+    Yields:
+        BatchResult: The outcome of each request, in completion order.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    if max_pending < max_workers:
+        raise ValueError("max_pending must not be smaller than max_workers")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nlr-batch")
+    pending: Dict[Future, tuple] = {}
+    spec_iter = enumerate(specs)
+    exhausted = False
+    try:
+        while True:
+            # Keep the submission window full without materializing the whole input.
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    index, spec = next(spec_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(_run, spec, common)] = (index, spec)
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, spec = pending.pop(future)
+                file_name, error, elapsed = future.result()
+                yield BatchResult(index, spec, file_name, error, elapsed)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    content BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+class ResponseCache:
+    """A persistent on-disk cache of raw NLR responses.
+
+    Entries are zlib-compressed and stored in a single SQLite file, so the cache can be shared
+    between threads and worker processes. When the compressed size exceeds `max_bytes` the least
+    recently used entries are evicted, and entries older than `ttl` seconds are treated as misses.
+
+    Args:
+        path (str): The path of the SQLite cache file. Parent directories are created if needed.
+        max_bytes (int): The maximum total compressed size of all entries.
+        ttl (float | None): The maximum age of an entry in seconds, or None to keep entries until evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024**3, ttl: Optional[float] = None) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        directory = os.path.dirname(os.fspath(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(_SCHEMA)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached content for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def put(self, key: str, content: bytes) -> None:
+        """Stores `content` under `key` and evicts least recently used entries beyond `max_bytes`."""
+        blob = zlib.compress(content, 6)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, content, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Deletes the least recently used entries until the cache fits in `max_bytes`."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss and eviction counts of this process, plus the stored entry count and size."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._conn.close()
@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+from click.core import ParameterSource
+
+from . import batch
+from .cache import ResponseCache
+from .grid import GridIndex
+from .journal import FAILED, DONE, JobJournal, job_key
+from .throttle import RateLimiter, Throttle
+
+DEFAULT_ATTRIBUTES = (
+    "air_temperature,clearsky_dhi,clearsky_dni,clearsky_ghi,cloud_type,dew_point,dhi,dni,fill_flag,"
+    "ghi,relative_humidity,solar_zenith_angle,surface_albedo,surface_pressure,total_precipitable_water,"
+    "wind_direction,wind_speed"
+)
+
+# Every request in a manifest must identify its site and year, everything else can be shared
+_REQUIRED_FIELDS = ("lon", "lat", "year", "location")
+_OPTION_FIELDS = (
+    "attributes",
+    "interval",
+    "utc",
+    "your_name",
+    "api_key",
+    "reason_for_use",
+    "your_affiliation",
+    "your_email",
+    "mailing_list",
+    "leap_year",
+)
+
+
+def read_manifest(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Reads a manifest of site/year requests from a CSV or JSON file.
+
+    A CSV manifest has a header row with at least the columns `lon`, `lat`, `year` and `location`.
+    Any other `download_epw` option (e.g. `interval`) may be added as a column; empty cells fall
+    back to the shared options. A JSON manifest is either a list of such objects or an object with
+    a `sites` list and an optional `defaults` object of options shared by all sites.
+
+    Args:
+        path (str): The path of the manifest. `.json` files are read as JSON, anything else as CSV.
+
+    Returns:
+        tuple: The per-site specs and the shared options from the manifest.
+    """
+    defaults: Dict[str, Any] = {}
+    if path.lower().endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults = dict(data.get("defaults", {}))
+            data = data.get("sites", [])
+        sites = [dict(site) for site in data]
+    else:
+        with open(path, "r", newline="") as f:
+            sites = [{k: v for k, v in row.items() if v not in (None, "")} for row in csv.DictReader(f)]
+
+    known = set(_REQUIRED_FIELDS + _OPTION_FIELDS)
+    for field in defaults:
+        if field not in known:
+            raise ValueError(f"Unknown manifest option '{field}'")
+    for i, site in enumerate(sites):
+        missing = [field for field in _REQUIRED_FIELDS if field not in site and field not in defaults]
+        if missing:
+            raise ValueError(f"Manifest entry {i} is missing {', '.join(missing)}")
+        unknown = [field for field in site if field not in known]
+        if unknown:
+            raise ValueError(f"Manifest entry {i} has unknown fields {', '.join(unknown)}")
+    return sites, defaults
+
+
+def _summary_item(spec: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the fields that identify a request in the summary."""
+    return {field: spec.get(field, defaults.get(field)) for field in _REQUIRED_FIELDS}
+
+
+@click.command()
+@click.pass_context
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output-dir", default=".", show_default=True, help="Directory the EPW files are written to.")
+@click.option("-j", "--workers", default=8, show_default=True, type=click.IntRange(min=1), help="Concurrent downloads.")
+@click.option("--summary", "summary_path", default=None, help="Summary JSON path [default: OUTPUT_DIR/summary.json].")
+@click.option(
+    "--api-key",
+    envvar=["NLR_API_KEY", "APIKEY"],
+    default=None,
+    help="NLR developer API key [env: NLR_API_KEY or APIKEY].",
+)
+@click.option("--attributes", default=DEFAULT_ATTRIBUTES, help="Comma-separated NSRDB attributes.")
+@click.option("--interval", default="60", show_default=True)
+@click.option("--utc", default="false", show_default=True)
+@click.option("--leap-year", default="false", show_default=True)
+@click.option("--name", "your_name", default="John+Doe", show_default=True)
+@click.option("--reason", "reason_for_use", default="beta+testing", show_default=True)
+@click.option("--affiliation", "your_affiliation", default="aaa", show_default=True)
+@click.option("--email", "your_email", default="Joe@Doe.edu", show_default=True)
+@click.option("--mailing-list", default="false", show_default=True)
+@click.option("--cache", "cache_path", default=None, help="SQLite response cache shared between runs.")
+@click.option("--grid", "grid_path", default=None, help="JSON NSRDB grid index of the Location IDs per cell.")
+@click.option(
+    "--rate",
+    default=1.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Requests per second per API key.",
+)
+@click.option("--max-attempts", default=5, show_default=True, type=click.IntRange(min=1), help="Attempts per request.")
+@click.option("--journal", "journal_path", default=None, help="SQLite job journal; rerunning resumes the job.")
+def main(
+    ctx: click.Context,
+    manifest: str,
+    output_dir: str,
+    workers: int,
+    summary_path: Optional[str],
+    cache_path: Optional[str],
+    grid_path: Optional[str],
+    journal_path: Optional[str],
+    rate: float,
+    max_attempts: int,
+    **options: Any,
+) -> None:
+    """Downloads the EPW files for every site/year in MANIFEST (CSV or JSON)."""
+    try:
+        sites, defaults = read_manifest(manifest)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="MANIFEST") from exc
+
+    # Options given on the command line or in the environment win over the manifest defaults, which win
+    # over the built-in option defaults; per-site values win over all of them
+    common = {k: v for k, v in options.items() if v is not None}
+    for field, value in defaults.items():
+        if field not in common or ctx.get_parameter_source(field) == ParameterSource.DEFAULT:
+            common[field] = value
+    if "api_key" not in common and not all("api_key" in site for site in sites):
+        raise click.UsageError("An API key is required: pass --api-key or set NLR_API_KEY or APIKEY.")
+
+    cache = ResponseCache(cache_path) if cache_path else None
+    grid = GridIndex(grid_path) if grid_path else None
+    # One throttle for all workers keeps the whole job within the per-key rate limit
+    throttle = Throttle(RateLimiter(rate), max_attempts=max_attempts)
+    common.update(output_dir=output_dir, cache=cache, grid=grid, throttle=throttle)
+
+    skipped = 0
+    journal = None
+    keys: List[str] = []
+    if journal_path:
+        # Completed items of an earlier run are skipped unless their output changed, failed ones are retried
+        journal = JobJournal(journal_path)
+        journal.add(sites, **common)
+        keys = [job_key(site, common) for site in sites]
+        journal.verify(keys)
+        skipped = sum(1 for item in journal.items(keys) if item["status"] == DONE)
+        results = journal.run(max_workers=workers, **common)
+    else:
+        results = batch.download_epw_batch(sites, max_workers=workers, **common)
+
+    items: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    length = len(sites) - skipped
+    with click.progressbar(length=length, label="Downloading", file=click.get_text_stream("stderr")) as bar:
+        for result in results:
+            item = _summary_item(result.spec, defaults)
+            item.update(
+                file_name=result.file_name,
+                elapsed=round(result.elapsed, 6),
+                error=None if result.ok else f"{type(result.error).__name__}: {result.error}",
+            )
+            item["index"] = result.index
+            items.append(item)
+            bar.update(1)
+    elapsed = time.perf_counter() - start
+
+    if journal is not None:
+        # Items that ran out of attempts in earlier runs are not retried, but must keep failing the job
+        processed = {item["index"] for item in items}
+        for row in journal.items(keys):
+            if row["status"] == FAILED and row["id"] - 1 not in processed:
+                item = _summary_item(row["spec"], defaults)
+                item.update(file_name=None, elapsed=None, error=row["error"], attempts=row["attempts"])
+                item["index"] = row["id"] - 1
+                items.append(item)
+    items.sort(key=lambda item: item.pop("index"))
+
+    if cache is not None:
+        cache.close()
+    if grid is not None:
+        grid.save()
+    if journal is not None:
+        journal.close()
+
+    failed = sum(1 for item in items if item["error"] is not None)
+    summary = {
+        "manifest": manifest,
+        "output_dir": output_dir,
+        "workers": workers,
+        "total": len(items),
+        "succeeded": len(items) - failed,
+        "failed": failed,
+        "skipped": skipped,
+        "retries": throttle.retries,
+        "elapsed": round(elapsed, 6),
+        "items": items,
+    }
+    if summary_path is None:
+        summary_path = os.path.join(output_dir, "summary.json")
+    directory = os.path.dirname(summary_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    click.echo(f"{summary['succeeded']} of {summary['total']} EPW files written in {elapsed:.1f}s")
+    if skipped:
+        click.echo(f"{skipped} EPW files were already written by an earlier run")
+    click.echo(f"Summary: {summary_path}")
+    if failed:
+        for item in items:
+            if item["error"] is not None:
+                click.echo(f"Failed: {item['location']} {item['year']}: {item['error']}", err=True)
+        raise SystemExit(1)
@@ -0,0 +1,144 @@
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import assets
+
+
+class ConversionResult(NamedTuple):
+    """The outcome of converting a single NSRDB CSV file."""
+
+    source: str
+    file_name: Optional[str]
+    error: Optional[BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_csv_files(source: str) -> List[str]:
+    """Returns the sorted CSV files in a directory, or the files matching a glob pattern."""
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.csv")
+    return sorted(glob.glob(source, recursive=True))
+
+
+def source_root(source: str) -> str:
+    """Returns the directory that a source directory or glob pattern finds its CSV files under."""
+    if os.path.isdir(source):
+        return source
+    parts = []
+    for part in os.path.normpath(os.path.dirname(source)).split(os.sep):
+        if any(char in part for char in "*?["):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def convert_file(path: str, output_dir: str, root: Optional[str] = None) -> str:
+    """
+    Converts one NSRDB CSV file to an EPW file named after it.
+
+    Args:
+        path (str): The path of the CSV file. Its file name without extension is used as the location.
+        output_dir (str): The directory the EPW file is written to.
+        root (str | None): A directory containing `path`. If given, the EPW file is written to the
+            same relative path under `output_dir`, so that `siteA/2012.csv` and `siteB/2012.csv`
+            do not overwrite each other.
+
+    Returns:
+        str: The path of the created EPW file.
+    """
+    location = os.path.splitext(os.path.basename(path))[0]
+    out = assets.convert_csv(path, location)
+    relative = os.path.dirname(os.path.relpath(path, root)) if root is not None else ""
+    file_name = assets._output_path(f"{location}.epw", os.path.join(output_dir, relative))
+    out.write(file_name, fixed_precision=True)
+    return file_name
+
+
+def _convert_chunk(
+    paths: Sequence[str], output_dir: str, root: Optional[str] = None
+) -> List[Tuple[Optional[str], Optional[BaseException]]]:
+    """Converts a chunk of files in a worker process, reporting failures per file."""
+    results: List[Tuple[Optional[str], Optional[BaseException]]] = []
+    for path in paths:
+        try:
+            results.append((convert_file(path, output_dir, root), None))
+        except Exception as exc:
+            results.append((None, exc))
+    return results
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Groups paths into lists of up to `size` items."""
+    chunk: List[str] = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def convert_directory(
+    source: str,
+    output_dir: str,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 16,
+) -> Iterator[ConversionResult]:
+    """
+    Converts every NSRDB CSV in a directory or matching a glob pattern to EPW on a process pool.
+
+    Parsing and formatting are CPU bound, so the files are spread over worker processes. Files are
+    submitted in chunks of `chunk_size` to amortize the inter-process overhead, and at most two
+    chunks per worker are in flight, so thousands of files never queue up at once. No network
+    access is needed. Each EPW file keeps the path of its CSV relative to `source` (or to the
+    directory part of the pattern before its first wildcard), so files with the same name in
+    different subdirectories stay apart.
+
+    Args:
+        source (str): A directory of `*.csv` files or a glob pattern (`**` is supported).
+        output_dir (str): The directory the EPW files are written to. It is created if needed.
+        max_workers (int | None): The number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int): The number of files converted per task.
+
+    Yields:
+        ConversionResult: The outcome of each file, in completion order.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    os.makedirs(output_dir, exist_ok=True)
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    max_pending = 2 * max_workers
+    pending: Dict[Future, List[str]] = {}
+    root = source_root(source)
+    chunks = _chunks(find_csv_files(source), chunk_size)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(_convert_chunk, chunk, output_dir, root)] = chunk
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                for path, (file_name, error) in zip(chunk, future.result()):
+                    yield ConversionResult(path, file_name, error)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
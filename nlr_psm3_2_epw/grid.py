@@ -0,0 +1,118 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+# NSRDB GOES v4 data is published on a ~2 km grid, earlier PSM versions on a ~4 km grid
+GOES_V4_RESOLUTION = 0.02
+PSM3_RESOLUTION = 0.04
+
+
+class GridIndex:
+    """Resolves coordinates to cells of a regular grid and records the NSRDB Location ID returned for each cell.
+
+    The grid is a regular lattice with the NSRDB's nominal spacing anchored at (-90, -180); it is
+    not aligned with the actual NSRDB pixel centers. By default the index only records which
+    Location ID the NSRDB returned for the sites in each cell, e.g. to look up a site's pixel
+    without network access, and requests keep the site's own coordinates. Since the cells are not
+    NSRDB pixels, sites in one cell can resolve to different pixels; every ID seen for a cell is
+    kept, and a cell with more than one is ambiguous and has no `location_id`.
+
+    With `snap_requests=True` requests are sent for the cell center instead, so nearby sites
+    become identical requests that share a single download and, with a `ResponseCache`, a single
+    cache entry. The cell center can be up to about 0.7 grid spacings away from the site, so a
+    site may then receive the data of an adjacent NSRDB pixel rather than its own.
+
+    The index can be persisted to a JSON file to keep the recorded Location IDs across runs.
+
+    Args:
+        path (str | None): The JSON file the index is loaded from and saved to.
+        resolution (float): The grid spacing in degrees.
+        snap_requests (bool): Whether requests are snapped to the cell center to share downloads.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, resolution: float = GOES_V4_RESOLUTION, snap_requests: bool = False
+    ) -> None:
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.path = path
+        self.resolution = resolution
+        self.snap_requests = snap_requests
+        self._locations: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.isfile(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("resolution") == resolution:
+                # Indexes saved before conflicts were tracked hold a single ID per cell
+                self._locations = {
+                    cell: [ids] if isinstance(ids, str) else list(ids) for cell, ids in data["locations"].items()
+                }
+
+    def _indices(self, lat: Union[str, float], lon: Union[str, float]) -> Tuple[int, int]:
+        """Returns the row and column of the cell containing the coordinate."""
+        # Rounding before flooring keeps coordinates on a cell edge from flipping cells due to float error
+        row = math.floor(round((float(lat) + 90) / self.resolution, 9))
+        col = math.floor(round((float(lon) + 180) / self.resolution, 9))
+        return row, col
+
+    def cell_id(self, lat: Union[str, float], lon: Union[str, float]) -> str:
+        """Returns the canonical ID of the cell containing the coordinate."""
+        row, col = self._indices(lat, lon)
+        return f"{self.resolution:g}:{row}:{col}"
+
+    def snap(self, lat: Union[str, float], lon: Union[str, float]) -> Tuple[float, float]:
+        """Returns the center of the cell containing the coordinate as (lat, lon)."""
+        row, col = self._indices(lat, lon)
+        return (
+            round(-90 + (row + 0.5) * self.resolution, 6),
+            round(-180 + (col + 0.5) * self.resolution, 6),
+        )
+
+    def record(self, cell_id: str, location_id: Union[str, int]) -> None:
+        """Records an NSRDB Location ID returned for a site in a cell, next to the ones already seen there."""
+        with self._lock:
+            ids = self._locations.setdefault(cell_id, [])
+            if str(location_id) not in ids:
+                ids.append(str(location_id))
+                ids.sort()
+
+    def location_ids(self, lat: Union[str, float], lon: Union[str, float]) -> List[str]:
+        """Returns every NSRDB Location ID recorded for the coordinate's cell."""
+        with self._lock:
+            return list(self._locations.get(self.cell_id(lat, lon), []))
+
+    def location_id(self, lat: Union[str, float], lon: Union[str, float]) -> Optional[str]:
+        """
+        Returns the recorded NSRDB Location ID for the coordinate's cell without any network access.
+
+        Returns:
+            str | None: The ID, or None if none was recorded or the sites of the cell resolved to
+            different pixels, so that the coordinate's own pixel is unknown.
+        """
+        ids = self.location_ids(lat, lon)
+        return ids[0] if len(ids) == 1 else None
+
+    def conflicts(self) -> Dict[str, List[str]]:
+        """Returns the cells whose sites resolved to more than one NSRDB Location ID."""
+        with self._lock:
+            return {cell: list(ids) for cell, ids in self._locations.items() if len(ids) > 1}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def save(self) -> None:
+        """Atomically writes the index to its JSON file."""
+        if self.path is None:
+            raise ValueError("GridIndex has no path to save to")
+        with self._lock:
+            data = {
+                "resolution": self.resolution,
+                "locations": {cell: list(ids) for cell, ids in self._locations.items()},
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,131 @@
+import contextlib
+import contextvars
+import time
+from typing import Any, Callable, Dict, Iterator, Mapping, NamedTuple, Optional, Tuple
+
+
+class StageEvent(NamedTuple):
+    """The measurements of one stage of a request, passed to the hook of `instrumented`.
+
+    The stages are `cache` (the response cache lookup), `request` (the HTTP round trip, including
+    rate limiting and the `retries` of a throttle), `parse` (reading the CSV), `transform` (mapping
+    it onto the EPW frame), `write` (writing the EPW file), `stream` (reading, transforming and
+    writing the response in `stream_epw`, with the response `bytes`; it also reports a `transform`
+    per chunk and one `write` with the time spent writing) and finally `total`, which covers the
+    whole call. Fields that do not apply to a stage are None.
+    """
+
+    stage: str
+    seconds: float
+    request: Mapping[str, Any]
+    bytes: Optional[int] = None
+    rows: Optional[int] = None
+    cache: Optional[str] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+    retries: Optional[int] = None
+
+
+Hook = Callable[[StageEvent], None]
+
+
+class StageRecord:
+    """The measurements a stage fills in while it runs."""
+
+    def __init__(self) -> None:
+        self.bytes: Optional[int] = None
+        self.rows: Optional[int] = None
+        self.cache: Optional[str] = None
+        self.status: Optional[int] = None
+        self.retries: Optional[int] = None
+
+
+# The hook and request fields of the call being instrumented in the current thread or task
+_current: contextvars.ContextVar[Optional[Tuple[Hook, Dict[str, Any]]]] = contextvars.ContextVar(
+    "nlr_psm3_2_epw_instrument", default=None
+)
+
+
+@contextlib.contextmanager
+def _timed(hook: Hook, name: str, request: Dict[str, Any]) -> Iterator[StageRecord]:
+    """Times a block and reports it to `hook`, also when it raises."""
+    record = StageRecord()
+    error = None
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        hook(
+            StageEvent(
+                name,
+                time.perf_counter() - start,
+                request,
+                record.bytes,
+                record.rows,
+                record.cache,
+                record.status,
+                error,
+                record.retries,
+            )
+        )
+
+
+@contextlib.contextmanager
+def instrumented(hook: Optional[Hook], **request: Any) -> Iterator[None]:
+    """
+    Reports a `StageEvent` to `hook` for every stage of the downloads and conversions in the block.
+
+    Events are reported from the thread that runs the stage, so the hook must be thread-safe if it
+    is shared between workers. Callers that wait for a download already in flight for another caller
+    only report the stages they run themselves. If `hook` is None, or the block is already
+    instrumented, nothing changes, so instrumented functions can call each other.
+
+    Args:
+        hook (Callable[[StageEvent], None] | None): Receives the event of each stage as it finishes.
+        **request: Fields that identify the request in every event, e.g. `lon`, `lat`, `year`, `location`.
+    """
+    if hook is None or _current.get() is not None:
+        yield
+        return
+    token = _current.set((hook, request))
+    try:
+        with _timed(hook, "total", request):
+            yield
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[StageRecord]:
+    """Times a pipeline stage and reports it to the hook of the enclosing `instrumented` block, if any.
+
+    Args:
+        name (str): The name of the stage.
+
+    Yields:
+        StageRecord: The record to fill in with the byte count, row count, cache status, HTTP status or retries.
+    """
+    current = _current.get()
+    if current is None:
+        yield StageRecord()
+        return
+    hook, request = current
+    with _timed(hook, name, request) as record:
+        yield record
+
+
+def report(name: str, seconds: float, **fields: Any) -> None:
+    """Reports a stage that was timed by the caller, e.g. because it ran in pieces, to the enclosing hook, if any.
+
+    Args:
+        name (str): The name of the stage.
+        seconds (float): The duration of the stage.
+        **fields: The other fields of the `StageEvent`, e.g. `bytes` or `rows`.
+    """
+    current = _current.get()
+    if current is not None:
+        hook, request = current
+        hook(StageEvent(name, seconds, request, **fields))
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from . import batch
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    checksum TEXT,
+    error TEXT,
+    worker TEXT,
+    updated REAL NOT NULL
+)
+"""
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+# The `download_epw` arguments that determine the written file; credentials and contact details do not
+KEY_FIELDS = ("lon", "lat", "year", "location", "attributes", "interval", "utc", "leap_year", "output_dir")
+
+
+def effective_spec(spec: Mapping[str, Any], common: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Returns the spec with the file-defining shared options it inherits from `common` filled in."""
+    effective = {k: v for k, v in (common or {}).items() if k in KEY_FIELDS and v is not None}
+    effective.update(spec)
+    return effective
+
+
+def job_key(spec: Mapping[str, Any], common: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Returns the key that identifies the file a request produces.
+
+    The key covers the spec merged with the file-defining shared options, so the same site
+    requested with a different interval, attribute list or output directory is a different item.
+    Values are compared as strings, so a year read from CSV and one read from JSON match.
+    """
+    effective = effective_spec(spec, common)
+    fields = {k: str(effective[k]) for k in KEY_FIELDS if effective.get(k) is not None}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def file_checksum(path: str) -> str:
+    """Returns the SHA-256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JobJournal:
+    """A persistent journal of the items of a batch job, so an interrupted job can be resumed.
+
+    Every request spec is recorded once under its key with its status, attempt count, output path
+    and output checksum. Items are claimed atomically, so several threads or worker processes can
+    take work from the same journal file. Restarting a job skips completed items and retries failed
+    ones until they reach `max_attempts`. Items claimed by a worker that died are handed out again
+    once their lease of `lease` seconds expires.
+
+    Args:
+        path (str): The path of the SQLite journal file. Parent directories are created if needed.
+        max_attempts (int): The number of attempts after which a failing item is given up.
+        lease (float): The number of seconds a claimed item stays reserved for its worker.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, lease: float = 600) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        directory = os.path.dirname(os.fspath(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(_SCHEMA)
+
+    def add(self, specs: Iterable[Mapping[str, Any]], **common: Any) -> int:
+        """
+        Records the request specs that are not in the journal yet and returns how many were added.
+
+        Each item is stored with the file-defining options it inherits from `common` (see `KEY_FIELDS`),
+        so it is always re-run with the options it was added with.
+
+        Args:
+            specs (Iterable[Mapping[str, Any]]): The per-site request specs.
+            **common: The options shared by every request, as passed to `run`.
+        """
+        now = time.time()
+        rows = []
+        for spec in specs:
+            effective = effective_spec(spec, common)
+            rows.append((job_key(effective), json.dumps(effective, default=str), now))
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany("INSERT OR IGNORE INTO jobs (key, spec, updated) VALUES (?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def claim(self, worker: str, failed_before: Optional[float] = None) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Reserves the next item that is pending, failed with attempts left, or whose lease expired.
+
+        Args:
+            worker (str): The name of the claiming worker, recorded for diagnostics.
+            failed_before (float | None): Only retry items that failed before this time, so a run
+                does not immediately retry its own failures. Defaults to now.
+
+        Returns:
+            tuple | None: The item's id, key and spec, or None if no item is available.
+        """
+        now = time.time()
+        if failed_before is None:
+            failed_before = now
+        with self._lock, self._conn:
+            # An immediate transaction takes the write lock up front, so no other process can
+            # claim the same row between the SELECT and the UPDATE
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT id, key, spec FROM jobs WHERE attempts < ? AND "
+                "(status = ? OR (status = ? AND updated < ?) OR (status = ? AND updated < ?)) ORDER BY id LIMIT 1",
+                (self.max_attempts, PENDING, FAILED, failed_before, RUNNING, now - self.lease),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, updated = ? WHERE id = ?",
+                    (RUNNING, worker, now, row[0]),
+                )
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def complete(self, key: str, output_path: str) -> None:
+        """Marks an item as done and records the checksum of its output file."""
+        checksum = file_checksum(output_path)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, output_path = ?, checksum = ?, error = NULL, updated = ? WHERE key = ?",
+                (DONE, output_path, checksum, time.time(), key),
+            )
+
+    def fail(self, key: str, error: str) -> None:
+        """Marks an item as failed so that it is retried while it has attempts left."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE key = ?", (FAILED, error, time.time(), key)
+            )
+
+    def reset_failed(self) -> int:
+        """Gives every failed item a fresh set of attempts and returns how many were reset."""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = ?, attempts = 0 WHERE status = ?", (PENDING, FAILED))
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of items per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def items(self, keys: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Returns the items with the given keys, or every item, with their spec, status, attempts,
+        output path, checksum and last error."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, spec, status, attempts, output_path, checksum, error FROM jobs ORDER BY id"
+            ).fetchall()
+        fields = ("id", "key", "spec", "status", "attempts", "output_path", "checksum", "error")
+        items = [dict(zip(fields, row)) for row in rows]
+        if keys is not None:
+            wanted = set(keys)
+            items = [item for item in items if item["key"] in wanted]
+        for item in items:
+            item["spec"] = json.loads(item["spec"])
+        return items
+
+    def verify(self, keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Re-queues completed items whose output file is missing or no longer matches its checksum.
+
+        Args:
+            keys (Iterable[str] | None): The keys of the items to check. All items are checked if None.
+
+        Returns:
+            int: The number of items that were re-queued.
+        """
+        stale = []
+        for item in self.items(keys):
+            if item["status"] != DONE:
+                continue
+            path = item["output_path"]
+            if not path or not os.path.isfile(path) or file_checksum(path) != item["checksum"]:
+                stale.append(item["key"])
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = 0, checksum = NULL WHERE key = ? AND status = ?",
+                [(PENDING, key, DONE) for key in stale],
+            )
+        return len(stale)
+
+    def run(self, max_workers: int = 8, worker: Optional[str] = None, **common: Any) -> Iterator[batch.BatchResult]:
+        """
+        Downloads the outstanding items of the journal with `download_epw_batch`, recording each outcome.
+
+        Items are claimed one at a time as the batch window has room, so several processes running
+        the same journal share the work without taking the same item twice. Each item is attempted
+        at most once per run.
+
+        Args:
+            max_workers (int): The number of concurrent downloads in this process.
+            worker (str | None): The name recorded for claimed items. Defaults to host and process ID.
+            **common: Keyword arguments passed to every `download_epw` call. The file-defining
+                options recorded with each item take precedence.
+
+        Yields:
+            BatchResult: The outcome of each item processed by this call, in completion order. The
+                index is the item's position in the journal.
+        """
+        if worker is None:
+            worker = f"{socket.gethostname()}:{os.getpid()}"
+        # Items that fail during this run are left for the next run instead of being retried at once
+        started = time.time()
+        claimed: List[Tuple[int, str]] = []
+
+        def _specs() -> Iterator[Dict[str, Any]]:
+            while True:
+                item = self.claim(worker, started)
+                if item is None:
+                    return
+                claimed.append(item[:2])
+                yield item[2]
+
+        # The window equals the pool size so no more items are reserved than can be worked on
+        for result in batch.download_epw_batch(_specs(), max_workers=max_workers, max_pending=max_workers, **common):
+            row_id, key = claimed[result.index]
+            if result.ok:
+                self.complete(key, result.file_name)
+            else:
+                self.fail(key, f"{type(result.error).__name__}: {result.error}")
+            yield result._replace(index=row_id - 1)
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._conn.close()
@@ -0,0 +1,293 @@
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from . import assets, instrument
+
+# Request latencies of the NSRDB API range from a few hundred milliseconds to minutes for 5-minute data
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Writing an EPW file takes milliseconds to about a second
+WRITE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escapes a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value, with integral values written without a decimal point."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Formats a label set, e.g. `{endpoint="tmy",status="200"}`."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """A metric family with a fixed set of label names, safe to update from many threads."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        """Formats the metric family in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        # Subclasses yield the `(name, label names, label values, value)` of every sample
+        for name, labelnames, labelvalues, value in self.samples():  # type: ignore[attr-defined]
+            lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        """Adds a non-negative amount to the count of a label set."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        """Returns the count of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(_Metric):
+    """Counts observations per label set in cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        if "le" in labelnames:
+            raise ValueError("Histograms cannot have a label named le")
+        bounds = sorted(float(bound) for bound in buckets)
+        if not bounds:
+            raise ValueError("Histograms need at least one bucket")
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(bounds) if math.isinf(bounds[-1]) else tuple(bounds) + (math.inf,)
+        # Per label set: the observations per bucket (not cumulative), then their sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Records one observation for a label set."""
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: object) -> int:
+        """Returns the number of observations of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            counts, _ = self._values.get(key, ([], []))
+            return sum(counts)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        bucket_labels = self.labelnames + ("le",)
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, key, total
+            yield f"{self.name}_count", self.labelnames, key, cumulative
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together, e.g. by `serve_metrics`."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Adds a metric and returns it. Names must be unique within the registry."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"A metric named {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Creates and registers a counter."""
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Creates and registers a histogram."""
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        """Formats every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+def endpoint(request: Dict[str, object]) -> str:
+    """Returns the NSRDB endpoint of an instrumented request: `tmy`, `aggregated`, or `unknown` without a year."""
+    if "year" not in request:
+        return "unknown"
+    return "tmy" if assets._is_tmy_name(request["year"]) else "aggregated"
+
+
+class PipelineMetrics:
+    """
+    Collects the stage events of the conversion pipeline into Prometheus metrics.
+
+    An instance is a hook for `fetch_epw`, `download_epw` and `stream_epw` (and so for the `common`
+    options of `download_epw_batch`). Share one instance between every worker of a service; its
+    metrics are thread-safe.
+
+    Args:
+        registry (MetricsRegistry | None): The registry the metrics are added to. Defaults to a new one.
+        latency_buckets (Sequence[float]): The buckets of the request and total latency histograms, in seconds.
+        write_buckets (Sequence[float]): The buckets of the EPW write time histogram, in seconds.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        write_buckets: Sequence[float] = WRITE_BUCKETS,
+    ) -> None:
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.request_seconds = self.registry.histogram(
+            "nlr_request_duration_seconds",
+            "Time of NLR API requests, including rate limiting and retries.",
+            ("endpoint",),
+            latency_buckets,
+        )
+        self.responses = self.registry.counter(
+            "nlr_responses_total", "NLR API responses by final HTTP status code.", ("endpoint", "status")
+        )
+        self.response_bytes = self.registry.counter(
+            "nlr_response_bytes_total", "Bytes of NLR API responses read, buffered or streamed.", ("endpoint",)
+        )
+        self.retries = self.registry.counter(
+            "nlr_request_retries_total", "Retried NLR API request attempts.", ("endpoint",)
+        )
+        self.cache_lookups = self.registry.counter(
+            "nlr_cache_lookups_total", "Response cache lookups by result.", ("result",)
+        )
+        self.write_seconds = self.registry.histogram(
+            "epw_write_duration_seconds", "Time of writing EPW files.", (), write_buckets
+        )
+        self.total_seconds = self.registry.histogram(
+            "epw_conversion_duration_seconds", "Time of whole conversions.", ("endpoint",), latency_buckets
+        )
+        self.errors = self.registry.counter("epw_stage_errors_total", "Failed pipeline stages.", ("stage",))
+
+    def __call__(self, event: instrument.StageEvent) -> None:
+        name = endpoint(dict(event.request))
+        if event.error is not None:
+            self.errors.inc(stage=event.stage)
+        if event.stage == "request":
+            self.request_seconds.observe(event.seconds, endpoint=name)
+            if event.status is not None:
+                self.responses.inc(endpoint=name, status=event.status)
+            if event.bytes:
+                self.response_bytes.inc(event.bytes, endpoint=name)
+            if event.retries:
+                self.retries.inc(event.retries, endpoint=name)
+        elif event.stage == "stream":
+            # Streamed responses are read after the request stage ends, so their bytes are only known here
+            if event.bytes:
+                self.response_bytes.inc(event.bytes, endpoint=name)
+        elif event.stage == "cache":
+            self.cache_lookups.inc(result=event.cache)
+        elif event.stage == "write":
+            self.write_seconds.observe(event.seconds)
+        elif event.stage == "total":
+            self.total_seconds.observe(event.seconds, endpoint=name)
+
+
+def metrics_handler(registry: MetricsRegistry, path: str = "/metrics") -> Type[BaseHTTPRequestHandler]:
+    """Returns a request handler class that serves the registry at `path`, for embedding in an existing server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != path:
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            # Scrapes every few seconds would flood stderr
+            pass
+
+    return MetricsHandler
+
+
+def serve_metrics(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+    """
+    Serves the registry in the Prometheus text format on a background thread.
+
+    Args:
+        registry (MetricsRegistry): The metrics to serve, e.g. `PipelineMetrics().registry`.
+        host (str): The interface to listen on. Defaults to localhost only.
+        port (int): The port to listen on, or 0 for any free port (see `server.server_address`).
+
+    Returns:
+        ThreadingHTTPServer: The running server. Call `shutdown()` and `server_close()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), metrics_handler(registry))
+    thread = threading.Thread(target=server.serve_forever, name="nlr-psm3-2-epw-metrics", daemon=True)
+    thread.start()
+    return server
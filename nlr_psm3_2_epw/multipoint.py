@@ -0,0 +1,245 @@
+import hashlib
+import io
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import assets, epw
+from .cache import ResponseCache
+from .throttle import Throttle
+
+# A conservative number of points per MULTIPOINT request, which keeps each response small enough for the CSV endpoint
+DEFAULT_POINTS_PER_REQUEST = 25
+
+# The farthest a returned location may be from a site, about one pixel of the ~4 km PSM3 grid (two of GOES v4)
+DEFAULT_MAX_DISTANCE_KM = 4.0
+
+# Kilometres per degree of latitude
+_KM_PER_DEGREE = 111.2
+
+# Metadata columns every location of a multi-location response must have
+_METADATA_COLUMNS = ("Location ID", "Latitude", "Longitude")
+
+
+def parse_multipoint_response(content: bytes) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Parses a multi-location NLR CSV response and splits its data rows by NSRDB Location ID.
+
+    The response is expected to start with one metadata row per returned location, followed by the
+    data rows of all locations, which carry a `Location ID` column. A response for a single location
+    without that column, like the one returned for a plain POINT, is also accepted. Any response that
+    does not match this layout raises a RuntimeError naming the mismatch, rather than being split
+    into the wrong sites.
+
+    Args:
+        content (bytes): The raw CSV response.
+
+    Returns:
+        tuple: The metadata of each location and its data rows, both keyed by Location ID as a string.
+    """
+    # The data section starts at its header line, which names the timestamp columns
+    start = content.find(b"\nYear,")
+    if start < 0:
+        raise RuntimeError("NLR response missing expected timestamp columns")
+    metadata = pd.read_csv(io.BytesIO(content[: start + 1]))
+    missing = [name for name in _METADATA_COLUMNS if name not in metadata.columns]
+    if missing:
+        raise RuntimeError(f"Unexpected multi-location NLR response: metadata has no {missing} columns")
+    metadata["Location ID"] = metadata["Location ID"].astype(str)
+    if metadata["Location ID"].duplicated().any():
+        raise RuntimeError("Unexpected multi-location NLR response: metadata repeats a Location ID")
+    df = pd.read_csv(io.BytesIO(content), skiprows=len(metadata) + 1)
+    if df.shape[0] <= 0:
+        raise RuntimeError("No data rows returned from NLR")
+
+    if "Location ID" in df.columns:
+        # Bolt Optimization: Demultiplex every location with one vectorized groupby instead of
+        # filtering the combined frame once per site.
+        frames = {str(location_id): frame for location_id, frame in df.groupby("Location ID", sort=False)}
+        unknown = sorted(set(frames) - set(metadata["Location ID"]))
+        if unknown:
+            raise RuntimeError(f"Unexpected multi-location NLR response: data rows for unlisted Location IDs {unknown}")
+        if len({len(frame) for frame in frames.values()}) > 1:
+            raise RuntimeError("Unexpected multi-location NLR response: locations have different numbers of data rows")
+    elif len(metadata) == 1:
+        frames = {metadata["Location ID"].iloc[0]: df}
+    else:
+        raise RuntimeError("Multi-location NLR response has no Location ID column")
+    return metadata, frames
+
+
+def _nearest(metadata: pd.DataFrame, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the row of the metadata location nearest to each coordinate and its distance in km."""
+    meta_lats = metadata["Latitude"].to_numpy(dtype=float)
+    meta_lons = metadata["Longitude"].to_numpy(dtype=float)
+    # An equirectangular distance is accurate enough to tell NSRDB pixels a few km apart
+    dlat = lats[:, None] - meta_lats[None, :]
+    dlon = (lons[:, None] - meta_lons[None, :]) * np.cos(np.radians(lats))[:, None]
+    distances = np.sqrt(dlat**2 + dlon**2) * _KM_PER_DEGREE
+    rows = np.argmin(distances, axis=1)
+    return rows, distances[np.arange(len(rows)), rows]
+
+
+def _clusters(sites: List[Mapping[str, Any]], points_per_request: int) -> List[List[int]]:
+    """Orders sites by the 1 degree cell they fall in and splits them into request-sized groups of nearby sites."""
+    order = sorted(
+        range(len(sites)),
+        key=lambda i: (
+            math.floor(float(sites[i]["lat"])),
+            math.floor(float(sites[i]["lon"])),
+            float(sites[i]["lat"]),
+            float(sites[i]["lon"]),
+        ),
+    )
+    return [order[start : start + points_per_request] for start in range(0, len(order), points_per_request)]
+
+
+def fetch_epw_multipoint(
+    sites: Iterable[Mapping[str, Any]],
+    year: Union[str, int],
+    attributes: str,
+    interval: str,
+    utc: str,
+    your_name: str,
+    api_key: str,
+    reason_for_use: str,
+    your_affiliation: str,
+    your_email: str,
+    mailing_list: str,
+    leap_year: str,
+    *,
+    points_per_request: int = DEFAULT_POINTS_PER_REQUEST,
+    cache: Optional[ResponseCache] = None,
+    throttle: Optional[Throttle] = None,
+    max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+) -> List[epw.EPW]:
+    """
+    Downloads one year for many sites with MULTIPOINT requests and converts each site to an EPW object.
+
+    Nearby sites are grouped into requests of up to `points_per_request` points, so a city-scale
+    portfolio takes a handful of requests instead of one per site. Each site gets the data of the
+    returned NSRDB location nearest to it; sites that fall in the same pixel share its data. If the
+    nearest returned location is farther than `max_distance_km`, e.g. because the API left out a
+    point outside its coverage, a RuntimeError is raised instead of giving the site another site's
+    data. The request options are the same as for `assets.fetch_epw`.
+
+    Args:
+        sites (Iterable[Mapping[str, Any]]): The sites, each with `lon`, `lat` and `location`.
+        year (str | int): The year or TMY dataset to download.
+        points_per_request (int): The maximum number of points per request.
+        cache (ResponseCache | None): A response cache, keyed by the combined request.
+        throttle (Throttle | None): A rate limiter with retries and a circuit breaker.
+        max_distance_km (float): The farthest a returned location may be from the site it is used for.
+
+    Returns:
+        list: The EPW object of every site, in the order of `sites`.
+    """
+    sites = list(sites)
+    if points_per_request < 1:
+        raise ValueError("points_per_request must be at least 1")
+
+    results: List[Optional[epw.EPW]] = [None] * len(sites)
+    for group in _clusters(sites, points_per_request):
+        members = [sites[i] for i in group]
+        url, payload = assets._prepare_request(
+            members[0]["lon"],
+            members[0]["lat"],
+            year,
+            attributes,
+            interval,
+            utc,
+            your_name,
+            api_key,
+            reason_for_use,
+            your_affiliation,
+            your_email,
+            mailing_list,
+            leap_year,
+        )
+        if len(members) > 1:
+            payload["wkt"] = "MULTIPOINT(" + ", ".join(f"{site['lon']} {site['lat']}" for site in members) + ")"
+        key = assets._request_key(url, payload)
+        flight_key = f"{key}:{hashlib.sha256(str(api_key).encode()).hexdigest()}"
+        content = assets._flight.do(flight_key, lambda: assets._load_content(url, payload, key, cache, throttle))
+        metadata, frames = parse_multipoint_response(content)
+
+        lats = np.array([float(site["lat"]) for site in members])
+        lons = np.array([float(site["lon"]) for site in members])
+        rows, distances = _nearest(metadata, lats, lons)
+        for i, row, distance in zip(group, rows, distances):
+            site = sites[i]
+            location_meta = metadata.iloc[row]
+            if distance > max_distance_km:
+                raise RuntimeError(
+                    f"NLR response has no location near site {site['location']} ({site['lat']}, {site['lon']}); "
+                    f"the nearest, Location ID {location_meta['Location ID']}, is {distance:.1f} km away"
+                )
+            frame = frames.get(location_meta["Location ID"])
+            if frame is None:
+                raise RuntimeError(f"NLR response has no data rows for Location ID {location_meta['Location ID']}")
+            results[i] = assets._build_epw(location_meta, frame, site["location"], site["lat"], site["lon"])
+    return results
+
+
+def download_epw_multipoint(
+    sites: Iterable[Mapping[str, Any]],
+    year: Union[str, int],
+    attributes: str,
+    interval: str,
+    utc: str,
+    your_name: str,
+    api_key: str,
+    reason_for_use: str,
+    your_affiliation: str,
+    your_email: str,
+    mailing_list: str,
+    leap_year: str,
+    *,
+    points_per_request: int = DEFAULT_POINTS_PER_REQUEST,
+    cache: Optional[ResponseCache] = None,
+    throttle: Optional[Throttle] = None,
+    max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+    output_dir: Optional[str] = None,
+) -> List[str]:
+    """
+    Downloads one year for many sites with MULTIPOINT requests and writes an EPW file per site.
+
+    Takes the same arguments as `fetch_epw_multipoint`.
+
+    Args:
+        output_dir (str | None): The directory the EPW files are written to. It is created if needed.
+            Defaults to the current working directory.
+
+    Returns:
+        list: The paths of the created EPW files, in the order of `sites`.
+    """
+    sites = list(sites)
+    outputs = fetch_epw_multipoint(
+        sites,
+        year,
+        attributes,
+        interval,
+        utc,
+        your_name,
+        api_key,
+        reason_for_use,
+        your_affiliation,
+        your_email,
+        mailing_list,
+        leap_year,
+        points_per_request=points_per_request,
+        cache=cache,
+        throttle=throttle,
+        max_distance_km=max_distance_km,
+    )
+    file_names = []
+    for site, out in zip(sites, outputs):
+        file_name = assets._output_path(
+            assets.epw_file_name(site["location"], site["lat"], site["lon"], year), output_dir
+        )
+        out.write(file_name, fixed_precision=True)
+        print("Success: File", file_name, "written")
+        file_names.append(file_name)
+    return file_names
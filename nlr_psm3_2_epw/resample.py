@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Timestamp columns; each hour keeps the timestamp of its first record
+TIME_COLUMNS = ("Year", "Month", "Day", "Hour", "Minute")
+
+# Integer-coded categories, for which an average is meaningless; each hour takes its most frequent code
+CATEGORICAL_COLUMNS = ("Cloud Type", "Fill Flag")
+
+# Irradiance columns (including the clear-sky ones) end with one of these names
+IRRADIANCE_SUFFIXES = ("GHI", "DNI", "DHI")
+
+
+def rows_per_hour(df: pd.DataFrame) -> int:
+    """Returns the number of records per hour of NSRDB data, from the distinct minutes it contains."""
+    return max(1, int(df["Minute"].nunique()))
+
+
+def _mode(values: np.ndarray) -> np.ndarray:
+    """Returns the most frequent value of each row of a 2D array, the earliest one on ties."""
+    counts = (values[:, :, None] == values[:, None, :]).sum(axis=2)
+    return values[np.arange(len(values)), counts.argmax(axis=1)]
+
+
+def to_hourly(df: pd.DataFrame, rows_per_hour: int) -> pd.DataFrame:
+    """
+    Aggregates sub-hourly NSRDB data rows to one row per hour.
+
+    Bolt Optimization:
+    Every column is reshaped to an (hours, rows_per_hour) array and reduced along its second
+    axis, so a year of 5-minute data is aggregated in a few numpy calls instead of a groupby
+    or a Python loop over 105k rows.
+
+    - Irradiance is integrated over the hour: each record's W/m² times its duration gives the
+      hour's Wh/m², so the energy of the sub-hourly data is conserved.
+    - Wind direction is averaged on the circle, so 350° and 10° average to 0° rather than 180°.
+    - Integer-coded categories such as the cloud type take the most frequent code of the hour.
+    - Every other numeric column, i.e. the state variables, is averaged.
+
+    Args:
+        df (pd.DataFrame): The NSRDB data rows, sorted by time and starting on a full hour.
+        rows_per_hour (int): The number of records per hour, e.g. 12 for 5-minute data.
+
+    Returns:
+        pd.DataFrame: The hourly data rows, with the same columns.
+    """
+    if len(df) % rows_per_hour:
+        raise RuntimeError("Sub-hourly NLR data does not cover whole hours")
+    hours = df["Hour"].to_numpy().reshape(-1, rows_per_hour)
+    if not (hours == hours[:, :1]).all():
+        raise RuntimeError("Sub-hourly NLR data does not cover whole hours")
+
+    hourly = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if name in TIME_COLUMNS or values.dtype.kind not in "iuf":
+            hourly[name] = values[::rows_per_hour]
+            continue
+        block = values.reshape(-1, rows_per_hour)
+        if name in CATEGORICAL_COLUMNS:
+            hourly[name] = _mode(block)
+        elif name.endswith(IRRADIANCE_SUFFIXES):
+            hourly[name] = block.sum(axis=1) * (1 / rows_per_hour)
+        elif name == "Wind Direction":
+            radians = np.radians(block)
+            hourly[name] = np.degrees(np.arctan2(np.sin(radians).mean(axis=1), np.cos(radians).mean(axis=1))) % 360
+        else:
+            hourly[name] = block.mean(axis=1)
+    return pd.DataFrame(hourly, columns=df.columns)
@@ -0,0 +1,84 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class SharedCallError(RuntimeError):
+    """Raised to a waiter when the shared call failed with an exception that cannot be copied."""
+
+
+def _waiter_error(error: BaseException) -> BaseException:
+    """Returns a fresh exception for a waiter, so concurrent raises never share one traceback."""
+    try:
+        own = copy.copy(error)
+    except Exception:
+        own = None
+    if type(own) is not type(error) or own is error:
+        own = SharedCallError(f"{type(error).__name__}: {error}")
+    own.__traceback__ = None
+    return own
+
+
+class _Call:
+    """An in-flight call whose outcome is shared with every caller of the same key."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    While a call for a key is running, every other caller for that key blocks and receives the
+    same result instead of starting its own call. If the call fails, each waiter raises its own
+    copy of the exception, chained to the original, or a `SharedCallError` if it cannot be copied.
+    Once the call finishes the key is forgotten, so later calls run again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Runs `fn` for `key`, or waits for the call already in flight for `key`.
+
+        Args:
+            key (str): The key that identifies equivalent calls.
+            fn (Callable[[], Any]): The function to run if no call for `key` is in flight.
+
+        Returns:
+            Any: The result of the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise _waiter_error(call.error) from call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Returns the number of keys with a call in flight."""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,244 @@
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+# Responses worth retrying: rate limited, or an upstream error that is usually transient
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """A thread-safe token bucket that admits `rate` calls per second with bursts of up to `capacity`.
+
+    Callers reserve a token and sleep outside the lock until it is due, so waiting callers are
+    admitted in order at exactly the configured rate.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Takes a token, sleeping until one is available, and returns the time slept."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def defer(self, seconds: float) -> None:
+        """Admits no further calls for `seconds`, e.g. after the server asked clients to back off."""
+        with self._lock:
+            self._refill()
+            # The next acquire takes one more token, so leave room for it to wait exactly `seconds`
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class RateLimiter:
+    """Keeps one token bucket per API key, since NSRDB enforces its rate limits per key.
+
+    Args:
+        rate (float): The default number of requests per second per key.
+        burst (float): The default number of requests a key may make back to back.
+        rates (dict | None): Per-key overrides of `rate`.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 1, rates: Optional[Dict[str, float]] = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict(rates or {})
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        """Returns the bucket of an API key, creating it on first use."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rates.get(key, self.rate), self.burst)
+            return bucket
+
+    def acquire(self, key: str) -> float:
+        """Waits until the API key may make another request and returns the time slept."""
+        return self.bucket(key).acquire()
+
+    def defer(self, key: str, seconds: float) -> None:
+        """Holds back every request made with the API key for `seconds`."""
+        self.bucket(key).defer(seconds)
+
+
+class CircuitBreaker:
+    """Pauses every caller once the upstream looks down, instead of letting each of them fail.
+
+    After `failure_threshold` consecutive failures the circuit opens and callers block for
+    `reset_timeout` seconds. Then a single probe call is let through: if it succeeds the circuit
+    closes and everyone resumes, if it fails the circuit opens for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._changed = 0.0
+        self._cond = threading.Condition()
+
+    def before_call(self) -> None:
+        """Blocks while the circuit is open or another caller is probing the upstream."""
+        with self._cond:
+            while self.state != self.CLOSED:
+                remaining = self._changed + self.reset_timeout - time.monotonic()
+                if remaining <= 0:
+                    # Become the probe; a probe that never reports back is replaced after another timeout
+                    self.state = self.HALF_OPEN
+                    self._changed = time.monotonic()
+                    return
+                self._cond.wait(remaining)
+
+    def record_success(self) -> None:
+        """Closes the circuit and wakes all paused callers."""
+        with self._cond:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._cond.notify_all()
+
+    def record_failure(self) -> None:
+        """Counts a failure and opens the circuit once the threshold is reached or a probe failed."""
+        with self._cond:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.failures = 0
+                self._changed = time.monotonic()
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given in seconds or as an HTTP date into seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class Throttle:
+    """Rate limits, retries and circuit-breaks NLR requests shared by all workers of a job.
+
+    Every attempt waits for the circuit breaker and the API key's token bucket. Connection errors,
+    timeouts and 5xx responses are retried after a jittered exponential backoff and count towards
+    opening the circuit. A 429 response holds back every request made with that API key for the
+    time given by its Retry-After header, or the backoff if it has none.
+
+    Args:
+        limiter (RateLimiter | None): The per-key rate limiter. Defaults to one request per second.
+        breaker (CircuitBreaker | None): The circuit breaker. Defaults to `CircuitBreaker()`.
+        max_attempts (int): The maximum number of attempts per request.
+        base_delay (float): The backoff before the second attempt, doubled for every further attempt.
+        max_delay (float): The upper bound of the backoff.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        """Returns the full-jitter backoff after the given zero-based attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(self, api_key: str, send: Callable[[], Any]) -> Any:
+        """
+        Sends a request with rate limiting and retries.
+
+        Args:
+            api_key (str): The API key the request is made with.
+            send (Callable[[], Any]): Sends the request once and returns the response.
+
+        Returns:
+            Any: The first response that is not retried, or the last response once attempts run out.
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.limiter.acquire(api_key)
+            last = attempt + 1 >= self.max_attempts
+            try:
+                response = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.breaker.record_failure()
+                if last:
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                if response.status_code == 429:
+                    # Being rate limited proves the upstream is alive
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if last:
+                    return response
+                delay = self.backoff(attempt)
+                wait = retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.limiter.defer(api_key, delay if wait is None else wait)
+                    delay = 0.0
+                elif wait is not None:
+                    delay = max(delay, wait)
+                # Release the connection of the discarded response; a streamed one holds it until closed
+                response.close()
+            with self._lock:
+                self.retries += 1
+            attempt += 1
+            if delay > 0:
+                time.sleep(delay)
@@ -0,0 +1,117 @@
+import io
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Connections kept open per host. requests defaults to 10, which a thread pool of more workers
+# overflows, so that every extra connection is opened for one request and then discarded.
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 32
+
+# Hosts a connection pool is kept for; NLR downloads only talk to one or two hosts
+DEFAULT_POOLS = 4
+
+# Seconds to wait for the TCP/TLS connection, and for each read once it is established. NLR can take
+# a while to start sending large sub-hourly responses, so the read timeout is the longer one.
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 20.0
+
+
+class Transport:
+    """
+    Sends the HTTP requests of `assets`, with tunable connection pooling, compression and timeouts.
+
+    Bolt Optimization:
+    All downloads share one transport, so TCP/TLS connections are kept alive and reused between
+    requests and threads. Give it at least as many connections per host as there are workers,
+    otherwise the connections that do not fit the pool are closed after every request. With
+    `block=True` a full pool makes workers wait for a free connection instead, which caps the
+    number of concurrent connections per host.
+
+    Args:
+        max_connections_per_host (int): The connections kept open, and with `block`, the most opened, per host.
+        pools (int): The number of hosts connection pools are kept for.
+        block (bool): Whether to wait for a free connection instead of opening one beyond the limit.
+        connect_timeout (float | None): Seconds to wait for a connection. None waits forever.
+        read_timeout (float | None): Seconds to wait for each read of the response. None waits forever.
+        compress (bool): Whether to ask for gzip/deflate compressed responses. CSV compresses about
+            5:1, so this only pays off to turn off on a very fast link.
+        session (requests.Session | None): The session to configure. Defaults to a new one.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        pools: int = DEFAULT_POOLS,
+        block: bool = False,
+        connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+        compress: bool = True,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        if max_connections_per_host < 1:
+            raise ValueError("max_connections_per_host must be at least 1")
+        if pools < 1:
+            raise ValueError("pools must be at least 1")
+        self.session = requests.Session() if session is None else session
+        # Retries are left to `throttle.Throttle`, which also respects the rate limits
+        adapter = HTTPAdapter(pool_connections=pools, pool_maxsize=max_connections_per_host, pool_block=block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if compress else "identity"
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Sends a request on the pooled session, with the transport's timeouts unless `timeout` is given."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        self.session.close()
+
+
+StubReply = Union[bytes, Tuple[int, bytes], Tuple[int, bytes, Mapping[str, str]]]
+
+
+class StubTransport:
+    """
+    A transport that answers every request with `handler` instead of the network, for tests and benchmarks.
+
+    Args:
+        handler (Callable[[str, str, Dict[str, Any]], StubReply]): Called with the method, the URL and
+            the query parameters of each request. Returns the body, or `(status, body)` or
+            `(status, body, headers)`.
+
+    Attributes:
+        calls (List[Tuple[str, str, dict]]): The `(method, url, params)` of every request received.
+    """
+
+    def __init__(self, handler: Callable[[str, str, Dict[str, Any]], StubReply]) -> None:
+        self.handler = handler
+        self.calls: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    def request(
+        self, method: str, url: str, params: Optional[Dict[str, Any]] = None, **_kwargs: Any
+    ) -> requests.Response:
+        params = dict(params or {})
+        self.calls.append((method, url, params))
+        reply = self.handler(method, url, params)
+        headers: Mapping[str, str] = {}
+        if isinstance(reply, bytes):
+            status, body = 200, reply
+        elif len(reply) == 2:
+            status, body = reply
+        else:
+            status, body, headers = reply
+        response = requests.Response()
+        response.status_code = status
+        response.url = requests.Request(method, url, params=params).prepare().url or url
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.raw = io.BytesIO(body)
+        return response
+
+    def close(self) -> None:
+        """Does nothing; there are no connections to close."""
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+METADATA_COLUMNS = [
+    "Source",
+    "Location ID",
+    "City",
+    "State",
+    "Country",
+    "Latitude",
+    "Longitude",
+    "Time Zone",
+    "Elevation",
+    "Local Time Zone",
+]
+
+DATA_COLUMNS = [
+    "Year",
+    "Month",
+    "Day",
+    "Hour",
+    "Minute",
+    "Temperature",
+    "Dew Point",
+    "Relative Humidity",
+    "Pressure",
+    "GHI",
+    "DNI",
+    "DHI",
+    "Wind Direction",
+    "Wind Speed",
+    "Cloud Type",
+    "Precipitable Water",
+    "Surface Albedo",
+]
+
+
+def build_nsrdb_csv(rows=24, interval=60, year=2012, location_id=123, lat=33.77, lon=-84.38):
+    """Builds the bytes of a realistic NSRDB CSV response with `rows` records at `interval` minutes."""
+    metadata = ["NSRDB", str(location_id), "-", "-", "-", str(lat), str(lon), "0", "20", "-5"]
+    lines = [",".join(METADATA_COLUMNS), ",".join(metadata), ",".join(DATA_COLUMNS)]
+
+    minutes = np.arange(rows) * interval
+    day_of_year = minutes // 1440
+    months = np.minimum(day_of_year // 31, 11) + 1
+    days = day_of_year % 31 + 1
+    hours = (minutes // 60) % 24
+    mins = minutes % 60
+    for i in range(rows):
+        lines.append(
+            f"{year},{months[i]},{days[i]},{hours[i]},{mins[i]},{20 + i % 10 / 10:.1f},{10 + i % 5},50.5,1013,"
+            f"{(i * 7) % 900},{(i * 11) % 1000},{(i * 3) % 300},{(i * 45) % 360},{2 + i % 3 / 2:.1f},{i % 10},"
+            "1.5,0.2"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.fixture
+def nsrdb_csv():
+    return build_nsrdb_csv
@@ -0,0 +1,93 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from nlr_psm3_2_epw import aio, assets, epw
+
+ARGS = ("ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_async_download_epw_writes_file(monkeypatch, tmp_path, nsrdb_csv):
+    seen = {}
+
+    def _handler(request):
+        seen["url"] = str(request.url)
+        return httpx.Response(200, content=nsrdb_csv(rows=24))
+
+    monkeypatch.chdir(tmp_path)
+
+    async def _main():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            async with aio.AsyncDownloader(client=_client(_handler), executor=pool) as downloader:
+                return await downloader.download_epw(0, 0, 2012, "Loc", *ARGS)
+
+    file_name = asyncio.run(_main())
+
+    assert seen["url"].startswith(assets.GOES_AGGREGATED_URL)
+    loaded = epw.EPW()
+    loaded.read(tmp_path / file_name)
+    assert loaded.dataframe.shape == (24, 35)
+    assert loaded.headers["LOCATION"][7] == "-5"
+
+
+def test_async_download_epw_caps_in_flight_requests(monkeypatch, tmp_path, nsrdb_csv):
+    state = {"active": 0, "peak": 0}
+
+    async def _handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return httpx.Response(200, content=nsrdb_csv(rows=2))
+
+    monkeypatch.chdir(tmp_path)
+
+    async def _main():
+        async with aio.AsyncDownloader(max_in_flight=2, client=_client(_handler)) as downloader:
+            return await asyncio.gather(*(downloader.download_epw(i, i, "tmy", f"Site{i}", *ARGS) for i in range(6)))
+
+    file_names = asyncio.run(_main())
+
+    assert len(set(file_names)) == 6
+    assert state["peak"] == 2
+
+
+def test_async_download_epw_non_ok_redacts_api_key():
+    def _handler(request):
+        return httpx.Response(403, json={"errors": ["forbidden"]})
+
+    async def _main():
+        async with aio.AsyncDownloader(semaphore=asyncio.Semaphore(1), client=_client(_handler)) as downloader:
+            await downloader.download_epw(0, 0, 2012, "Loc", *ARGS)
+
+    with pytest.raises(RuntimeError, match="403") as exc:
+        asyncio.run(_main())
+
+    assert "key" not in str(exc.value).split("?", 1)[1]
+
+
+def test_async_downloader_owns_and_closes_client():
+    async def _main():
+        downloader = aio.AsyncDownloader()
+        await downloader.aclose()
+        return downloader._client
+
+    assert asyncio.run(_main()).is_closed
+
+
+def test_async_downloader_rejects_bad_limit():
+    with pytest.raises(ValueError):
+        aio.AsyncDownloader(max_in_flight=0)
+
+
+def test_async_downloader_requires_httpx(monkeypatch):
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    with pytest.raises(ImportError, match="nlr-psm3-2-epw\\[async\\]"):
+        aio.AsyncDownloader()
@@ -1,9 +1,14 @@
+import io
+import os
+import threading
+import time
+
 import pandas as pd
 import pytest
 import requests
 
 from nlr_psm3_2_epw import assets
-from nlr_psm3_2_epw import constants
+from nlr_psm3_2_epw import cache, constants, epw, grid
 
 
 class DummyResponse:
@@ -21,6 +26,9 @@ class DummyResponse:
             raise self._json_error
         return self._json_data
 
+    def close(self):
+        self.closed = True
+
 
 def _build_all_data(row_count, include_time_columns=True, bad_time=False):
     columns = [
@@ -346,3 +354,568 @@ def test_download_epw_sanitizes_bad_lat_lon(monkeypatch, tmp_path):
     # Filename should use "bad-lat" and "bad-lon" strings directly, and sanitize location
     current_year = assets.datetime.now().year
     assert (tmp_path / f"Loc_w__Spaces_bad-lat_bad-lon_2012_{current_year}.epw").exists()
+
+
+def test_request_key_ignores_credentials_and_attribute_order():
+    url, payload = assets._prepare_request(
+        0, 0, 2012, "ghi,dni", "60", "false", "Name", "key1", "reason", "aff", "a@b.c", "false", "false"
+    )
+    _, other = assets._prepare_request(
+        0, 0, 2012, "dni,ghi", "60", "false", "Other", "key2", "other", "org", "x@y.z", "true", "false"
+    )
+    _, different = assets._prepare_request(
+        1, 0, 2012, "ghi,dni", "60", "false", "Name", "key1", "reason", "aff", "a@b.c", "false", "false"
+    )
+
+    assert assets._request_key(url, payload) == assets._request_key(url, other)
+    assert assets._request_key(url, payload) != assets._request_key(url, different)
+
+
+def test_download_epw_serves_repeat_requests_from_cache(monkeypatch, tmp_path, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(url)
+        return DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    monkeypatch.chdir(tmp_path)
+    store = cache.ResponseCache(tmp_path / "cache.sqlite")
+
+    for _ in range(3):
+        assets.download_epw(
+            0,
+            0,
+            2012,
+            "Loc",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            cache=store,
+        )
+
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 2
+    assert store.stats()["misses"] == 1
+
+
+def test_download_epw_grid_shares_cache_between_nearby_sites(monkeypatch, tmp_path, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["wkt"])
+        return DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3, location_id=456))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    monkeypatch.chdir(tmp_path)
+    store = cache.ResponseCache(tmp_path / "cache.sqlite")
+    index = grid.GridIndex(snap_requests=True)
+
+    for lat, lon, name in [(33.7701, -84.3824, "A"), (33.7705, -84.3820, "B")]:
+        file_name = assets.download_epw(
+            lon,
+            lat,
+            2012,
+            name,
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            cache=store,
+            grid=index,
+        )
+        loaded = epw.EPW()
+        loaded.read(tmp_path / file_name)
+        # Headers keep the site's own coordinates
+        assert loaded.headers["LOCATION"][5] == str(lat)
+
+    snapped_lat, snapped_lon = index.snap(33.7701, -84.3824)
+    assert calls == [f"POINT({snapped_lon} {snapped_lat})"]
+    assert index.location_id(33.7701, -84.3824) == "456"
+
+
+def test_download_epw_grid_keeps_site_coordinates_by_default(monkeypatch, tmp_path, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["wkt"])
+        return DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3, location_id=456))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    index = grid.GridIndex()
+
+    for lat, lon in [(33.7701, -84.3824), (33.7705, -84.3820)]:
+        assets.fetch_epw(
+            lon,
+            lat,
+            2012,
+            "A",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            grid=index,
+        )
+
+    # Without snapping each site is requested at its own coordinates and only the Location ID is recorded
+    assert calls == ["POINT(-84.3824 33.7701)", "POINT(-84.382 33.7705)"]
+    assert index.location_id(33.7705, -84.3820) == "456"
+
+
+def test_download_epw_coalesces_concurrent_identical_requests(monkeypatch, tmp_path, nsrdb_csv):
+    release = threading.Event()
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(url)
+        release.wait(5)
+        return DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    monkeypatch.chdir(tmp_path)
+
+    file_names = []
+
+    def _download(name):
+        file_names.append(
+            assets.download_epw(
+                0, 0, 2012, name, "ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false"
+            )
+        )
+
+    threads = [threading.Thread(target=_download, args=(f"Site{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    # Release the download only once every other caller is waiting on it
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        calls_in_flight = list(assets._flight._calls.values())
+        if calls_in_flight and calls_in_flight[0].waiters == 3:
+            break
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(set(file_names)) == 4
+
+
+def test_fetch_epw_does_not_coalesce_requests_with_different_api_keys(monkeypatch, nsrdb_csv):
+    release = threading.Event()
+    keys = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        keys.append(params["api_key"])
+        release.wait(5)
+        if params["api_key"] == "bad":
+            return DummyResponse(ok=False, url=url, status_code=403, json_data={"error": "invalid key"})
+        return DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    outcomes = {}
+
+    def _fetch(api_key):
+        try:
+            outcomes[api_key] = assets.fetch_epw(
+                0, 0, 2012, "A", "ghi", "60", "false", "Name", api_key, "reason", "aff", "email", "false", "false"
+            )
+        except RuntimeError as exc:
+            outcomes[api_key] = exc
+
+    threads = [threading.Thread(target=_fetch, args=(api_key,)) for api_key in ("good", "bad")]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while len(keys) < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Each key makes its own request and only the invalid key sees the error
+    assert sorted(keys) == ["bad", "good"]
+    assert isinstance(outcomes["good"], epw.EPW)
+    assert "403" in str(outcomes["bad"])
+
+
+def test_fetch_epw_returns_epw_without_writing(monkeypatch, tmp_path, nsrdb_csv):
+    monkeypatch.setattr(
+        assets._session,
+        "request",
+        lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3)),
+    )
+    monkeypatch.chdir(tmp_path)
+
+    out = assets.fetch_epw(
+        0, 0, 2012, "Loc", "ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false"
+    )
+
+    assert list(tmp_path.iterdir()) == []
+    assert out.dataframe.shape == (3, 35)
+    assert out.to_bytes().startswith(b"LOCATION,Loc,")
+
+
+def _multi_year_csv(nsrdb_csv, years, rows=3):
+    """Concatenates single-year responses into the body of a combined multi-year response."""
+    parts = [nsrdb_csv(rows=rows, year=years[0])]
+    for year in years[1:]:
+        parts.append(b"".join(nsrdb_csv(rows=rows, year=year).splitlines(keepends=True)[3:]))
+    return b"".join(parts)
+
+
+def test_fetch_epw_years_splits_one_request_by_year(monkeypatch, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["names"])
+        return DummyResponse(ok=True, url=url, content=_multi_year_csv(nsrdb_csv, [2001, 2000, 2002]))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+
+    out = assets.fetch_epw_years(
+        0, 0, [2002, "2000", 2001], "A", "ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false"
+    )
+
+    assert calls == ["2000,2001,2002"]
+    assert list(out) == [2000, 2001, 2002]
+    for year, weather in out.items():
+        assert weather.dataframe.shape == (3, 35)
+        assert set(weather.dataframe["Year"]) == {year}
+
+
+def test_fetch_epw_years_chunks_requests(monkeypatch, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["names"])
+        years = [int(name) for name in params["names"].split(",")]
+        return DummyResponse(ok=True, url=url, content=_multi_year_csv(nsrdb_csv, years))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+
+    out = assets.fetch_epw_years(
+        0,
+        0,
+        range(2000, 2005),
+        "A",
+        "ghi",
+        "60",
+        "false",
+        "Name",
+        "key",
+        "reason",
+        "aff",
+        "email",
+        "false",
+        "false",
+        years_per_request=2,
+    )
+
+    assert calls == ["2000,2001", "2002,2003", "2004"]
+    assert list(out) == [2000, 2001, 2002, 2003, 2004]
+
+
+@pytest.mark.parametrize(
+    "years, kwargs, message",
+    [
+        (["tmy-2022", 2000], {}, "numeric years"),
+        ([], {}, "At least one year"),
+        ([2000], {"years_per_request": 0}, "years_per_request"),
+    ],
+)
+def test_fetch_epw_years_rejects_bad_arguments(years, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        assets.fetch_epw_years(
+            0, 0, years, "A", "ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false", **kwargs
+        )
+
+
+def test_fetch_epw_years_reports_missing_years(monkeypatch, nsrdb_csv):
+    monkeypatch.setattr(
+        assets._session,
+        "request",
+        lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=_multi_year_csv(nsrdb_csv, [2000])),
+    )
+
+    with pytest.raises(RuntimeError, match="no data for 2001, 2002"):
+        assets.fetch_epw_years(
+            0,
+            0,
+            [2000, 2001, 2002],
+            "A",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+        )
+
+
+@pytest.mark.parametrize("stitch", [False, True])
+def test_download_epw_years_writes_per_year_or_stitched_files(monkeypatch, tmp_path, nsrdb_csv, stitch):
+    monkeypatch.setattr(
+        assets._session,
+        "request",
+        lambda _method, url, **_kwargs: DummyResponse(
+            ok=True, url=url, content=_multi_year_csv(nsrdb_csv, [2000, 2001])
+        ),
+    )
+
+    file_names = assets.download_epw_years(
+        0,
+        0,
+        [2000, 2001],
+        "Loc",
+        "ghi",
+        "60",
+        "false",
+        "Name",
+        "key",
+        "reason",
+        "aff",
+        "email",
+        "false",
+        "false",
+        output_dir=str(tmp_path),
+        stitch=stitch,
+    )
+
+    labels = ["2000-2001"] if stitch else ["2000", "2001"]
+    assert [os.path.basename(name).split("_")[3] for name in file_names] == labels
+    years = []
+    for name in file_names:
+        weather = epw.EPW()
+        weather.read(name)
+        years.append(list(weather.dataframe["Year"]))
+    assert years == ([[2000] * 3 + [2001] * 3] if stitch else [[2000] * 3, [2001] * 3])
+
+
+def test_download_epw_years_single_year_stitch_keeps_year_label(monkeypatch, tmp_path, nsrdb_csv):
+    monkeypatch.setattr(
+        assets._session,
+        "request",
+        lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=_multi_year_csv(nsrdb_csv, [2000])),
+    )
+
+    file_names = assets.download_epw_years(
+        0,
+        0,
+        [2000],
+        "Loc",
+        "ghi",
+        "60",
+        "false",
+        "Name",
+        "key",
+        "reason",
+        "aff",
+        "email",
+        "false",
+        "false",
+        output_dir=str(tmp_path),
+        stitch=True,
+    )
+
+    assert os.path.basename(file_names[0]).split("_")[3] == "2000"
+
+
+class StreamingResponse(DummyResponse):
+    def __init__(self, url, content):
+        super().__init__(ok=True, url=url)
+        self.raw = io.BytesIO(content)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("sub_hourly", [False, True])
+def test_stream_epw_matches_buffered_download(monkeypatch, tmp_path, nsrdb_csv, sub_hourly):
+    content = nsrdb_csv(rows=48, interval=5)
+    responses = []
+
+    def _fake_request(_method, url, params=None, stream=False, **_kwargs):
+        if stream:
+            responses.append(StreamingResponse(url, content))
+            return responses[-1]
+        return DummyResponse(ok=True, url=url, content=content)
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    options = ("ghi", "5", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+    buffered = assets.download_epw(
+        0, 0, 2012, "Loc", *options, output_dir=str(tmp_path / "buffered"), sub_hourly=sub_hourly
+    )
+    # Chunks of 7 rows split most hours of the 5-minute data
+    streamed = assets.stream_epw(
+        0, 0, 2012, "Loc", *options, output_dir=str(tmp_path / "streamed"), chunk_rows=7, sub_hourly=sub_hourly
+    )
+
+    with open(buffered, "rb") as f1, open(streamed, "rb") as f2:
+        assert f1.read() == f2.read()
+    assert responses[0].closed
+    assert os.listdir(tmp_path / "streamed") == [os.path.basename(streamed)]
+
+
+@pytest.mark.parametrize("content", [b"", b"Source,Location ID\n", "header"])
+def test_stream_epw_rejects_empty_responses(monkeypatch, tmp_path, nsrdb_csv, content):
+    if content == "header":
+        content = nsrdb_csv(rows=0)
+    monkeypatch.setattr(assets._session, "request", lambda _method, url, **_kwargs: StreamingResponse(url, content))
+
+    with pytest.raises(RuntimeError, match="No data rows"):
+        assets.stream_epw(
+            0,
+            0,
+            2012,
+            "Loc",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            output_dir=str(tmp_path),
+        )
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_epw_removes_partial_file_on_error(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=20)
+    monkeypatch.setattr(assets._session, "request", lambda _method, url, **_kwargs: StreamingResponse(url, content))
+
+    def _fail(*_args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(assets.epw.EPW, "_format_data", _fail)
+
+    with pytest.raises(OSError, match="disk full"):
+        assets.stream_epw(
+            0,
+            0,
+            2012,
+            "Loc",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            output_dir=str(tmp_path),
+        )
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_epw_rejects_bad_chunk_rows():
+    with pytest.raises(ValueError, match="chunk_rows"):
+        assets.stream_epw(
+            0,
+            0,
+            2012,
+            "Loc",
+            "ghi",
+            "60",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            chunk_rows=0,
+        )
+
+
+def test_stream_epw_rejects_incomplete_hours(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=30, interval=5)
+    monkeypatch.setattr(assets._session, "request", lambda _method, url, **_kwargs: StreamingResponse(url, content))
+
+    with pytest.raises(RuntimeError, match="whole hours"):
+        assets.stream_epw(
+            0,
+            0,
+            2012,
+            "Loc",
+            "ghi",
+            "5",
+            "false",
+            "Name",
+            "key",
+            "reason",
+            "aff",
+            "email",
+            "false",
+            "false",
+            output_dir=str(tmp_path),
+        )
+
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("sub_hourly", [False, True])
+def test_convert_csv_aggregates_sub_hourly_data(nsrdb_csv, sub_hourly):
+    out = assets.convert_csv(nsrdb_csv(rows=24, interval=30), "Loc", sub_hourly=sub_hourly)
+
+    frame = out.dataframe
+    if sub_hourly:
+        assert out.headers["DATA PERIODS"][1] == "2"
+        assert list(frame["Hour"][:4]) == [1, 1, 2, 2]
+        assert list(frame["Minute"][:4]) == [30, 60, 30, 60]
+    else:
+        assert out.headers["DATA PERIODS"][1] == "1"
+        assert len(frame) == 12
+        assert list(frame["Hour"][:3]) == [1, 2, 3]
+        assert list(frame["Minute"][:3]) == [0, 0, 0]
+        # Irradiance is integrated over the hour: two half hours of 0 and 7 W/m2 give 3.5 Wh/m2
+        assert frame["Global Horizontal Radiation"][0] == 3.5
+    assert constants.DEFAULT_HEADERS["DATA PERIODS"][1] == "1"
+
+
+def test_fetch_epw_compact(monkeypatch, nsrdb_csv):
+    monkeypatch.setattr(
+        assets._session,
+        "request",
+        lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=nsrdb_csv(rows=3)),
+    )
+
+    out = assets.fetch_epw(
+        0, 0, 2012, "Loc", "ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false", compact=True
+    )
+
+    assert out.dataframe["Visibility"].dtype == "category"
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from nlr_psm3_2_epw import assets
+from nlr_psm3_2_epw import batch
+
+
+def test_download_epw_batch_merges_common_options(monkeypatch):
+    calls = []
+
+    def _fake_download(**kwargs):
+        calls.append(kwargs)
+        return f"{kwargs['location']}.epw"
+
+    monkeypatch.setattr(assets, "download_epw", _fake_download)
+
+    specs = [{"lon": i, "lat": i, "year": 2012, "location": f"Site{i}"} for i in range(5)]
+    results = list(batch.download_epw_batch(specs, max_workers=2, api_key="key", year=2000))
+
+    assert sorted(r.index for r in results) == list(range(5))
+    assert all(r.ok for r in results)
+    assert sorted(r.file_name for r in results) == [f"Site{i}.epw" for i in range(5)]
+    # Per-site values win over shared options
+    assert all(call["year"] == 2012 and call["api_key"] == "key" for call in calls)
+
+
+def test_download_epw_batch_reports_per_item_errors(monkeypatch):
+    def _fake_download(**kwargs):
+        if kwargs["location"] == "bad":
+            raise RuntimeError("boom")
+        return "good.epw"
+
+    monkeypatch.setattr(assets, "download_epw", _fake_download)
+
+    results = {r.spec["location"]: r for r in batch.download_epw_batch([{"location": "good"}, {"location": "bad"}])}
+
+    assert results["good"].ok
+    assert results["good"].file_name == "good.epw"
+    assert not results["bad"].ok
+    assert results["bad"].file_name is None
+    assert str(results["bad"].error) == "boom"
+
+
+def test_download_epw_batch_bounds_in_flight_requests(monkeypatch):
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def _fake_download(**kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        with lock:
+            state["active"] -= 1
+        return "x.epw"
+
+    consumed = []
+
+    def _specs():
+        for i in range(20):
+            consumed.append(i)
+            yield {"location": str(i)}
+
+    monkeypatch.setattr(assets, "download_epw", _fake_download)
+
+    results = batch.download_epw_batch(_specs(), max_workers=3, max_pending=4)
+    first = next(results)
+    # The input is consumed lazily, never more than one window ahead
+    assert len(consumed) <= 4 + 1
+    rest = list(results)
+
+    assert len(rest) + 1 == 20
+    assert first.ok
+    assert state["peak"] <= 3
+
+
+def test_download_epw_batch_empty_input():
+    assert list(batch.download_epw_batch([])) == []
+
+
+@pytest.mark.parametrize("kwargs", [{"max_workers": 0}, {"max_workers": 4, "max_pending": 2}])
+def test_download_epw_batch_rejects_bad_limits(kwargs):
+    with pytest.raises(ValueError):
+        list(batch.download_epw_batch([{}], **kwargs))
@@ -0,0 +1,171 @@
+import importlib.util
+import json
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from nlr_psm3_2_epw import assets, constants
+
+_spec = importlib.util.spec_from_file_location(
+    "bench_pipeline", Path(__file__).resolve().parents[1] / "benchmarks" / "bench_pipeline.py"
+)
+bench = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench)
+
+
+@pytest.mark.parametrize("interval, tmy", [(60, False), (5, False), (60, True)])
+def test_synthetic_nsrdb_csv_parses_like_a_real_response(interval, tmy):
+    metadata, df = assets._parse_response(bench.synthetic_nsrdb_csv(interval, tmy, days=2))
+
+    assert metadata["Location ID"] == 1234567
+    assert len(df) == 2 * 24 * 60 // interval
+    years = set(df["Year"])
+    assert years <= set(range(1998, 2021)) if tmy else years == {2011}
+
+
+def test_run_measures_every_stage_and_restores_the_session(tmp_path):
+    request = assets._session.request
+    results = bench.run(repeat=1, days=2, cases=[("hourly", 60, False), ("5min", 5, False)])
+
+    assert assets._session.request == request
+    assert list(results["cases"]) == ["hourly", "5min"]
+    assert results["cases"]["5min"]["rows"] == 576
+    for case in results["cases"].values():
+        assert set(case["stages"]) == set(bench.STAGES)
+        assert all(stage["seconds"] > 0 and stage["peak_bytes"] > 0 for stage in case["stages"].values())
+    assert "hourly" in bench.report(results)
+
+
+def test_regressions_compares_time_and_memory_against_the_threshold():
+    def _results(seconds, peak):
+        return {"cases": {"hourly": {"stages": {"parse": {"seconds": seconds, "peak_bytes": peak}}}}}
+
+    baseline = _results(1.0, 100)
+    baseline["cases"]["retired"] = {"stages": {}}
+
+    floor = {"seconds": 0.0, "peak_bytes": 0}
+    assert bench.regressions(_results(1.2, 120), baseline, 0.25, floor) == []
+    found = bench.regressions(_results(1.5, 200), baseline, 0.25, floor)
+    assert [line.split(":")[0] for line in found] == ["hourly parse seconds", "hourly parse peak_bytes"]
+    assert bench.regressions({"cases": {"new": {"stages": {}}}}, baseline, 0.25) == []
+    assert bench.regressions(_results(9, 900), {"cases": {"hourly": {"stages": {}}}}, 0.25) == []
+
+
+def test_regressions_ignore_differences_below_the_noise_floor():
+    def _results(seconds, peak):
+        return {"cases": {"hourly": {"stages": {"transform": {"seconds": seconds, "peak_bytes": peak}}}}}
+
+    # +54% of a 1.3 ms stage, the jitter of an unloaded machine, is below the default floor
+    assert bench.regressions(_results(0.00199, 2**20), _results(0.00129, 2**20), 0.5) == []
+    # Doubling a 50 ms stage is above it, while 100 KiB more memory is not
+    found = bench.regressions(_results(0.1, 2**20 + 100 * 1024), _results(0.05, 2**20 // 2), 0.5)
+    assert [line.split(":")[0] for line in found] == ["hourly transform seconds", "hourly transform peak_bytes"]
+    found = bench.regressions(_results(0.1, 2**20 + 100 * 1024), _results(0.05, 2**20), 0.05)
+    assert [line.split(":")[0] for line in found] == ["hourly transform seconds"]
+
+
+def test_main_writes_results_and_checks_the_baseline(monkeypatch, tmp_path, capsys):
+    fake = {"cases": {"hourly": {"rows": 1, "stages": {s: {"seconds": 1.0, "peak_bytes": 1} for s in bench.STAGES}}}}
+    monkeypatch.setattr(bench, "run", lambda repeat: fake)
+    baseline = tmp_path / "baseline.json"
+
+    assert bench.main(["--baseline", str(baseline), "--update-baseline", "--output", str(tmp_path / "out.json")]) == 0
+    assert (tmp_path / "out.json").read_text() == baseline.read_text()
+    assert bench.main(["--baseline", str(baseline)]) == 0
+
+    fake["cases"]["hourly"]["stages"]["write"]["seconds"] = 3.0
+    assert bench.main(["--baseline", str(baseline)]) == 1
+    assert "REGRESSION hourly write seconds" in capsys.readouterr().out
+
+
+def _load_script(name):
+    spec = importlib.util.spec_from_file_location(
+        name, Path(__file__).resolve().parents[1] / "benchmarks" / f"{name}.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+mock = _load_script("mock_nsrdb")
+load = _load_script("load_test")
+
+
+def test_mock_responses_are_deterministic_per_request():
+    path = urlsplit(constants.GOES_AGGREGATED_URL).path
+    params = {"names": "2015", "interval": "30", "wkt": "POINT(-105 39)"}
+
+    first = mock.response_for(path, params, days=2)
+    assert mock.response_for(path, dict(params), days=2) == first
+    assert mock.response_for(path, dict(params, wkt="POINT(-104 39)"), days=2) != first
+    metadata, df = assets._parse_response(first)
+    assert len(df) == 2 * 48
+    assert set(df["Year"]) == {2015}
+
+    tmy_path = urlsplit(constants.GOES_TMY_URL).path
+    _, tmy = assets._parse_response(mock.response_for(tmy_path, {"names": "tmy-2022", "interval": "30"}, days=2))
+    assert len(tmy) == 2 * 24
+
+
+def test_mock_server_injects_faults():
+    config = mock.MockConfig(latency=0.01, rate_limit=2, failure_ratio=0.5, days=1)
+    server = mock.MockNSRDB(config=config).start()
+    url = server.url + urlsplit(constants.GOES_AGGREGATED_URL).path
+    try:
+        assert requests.get(server.url + "/other", params={"api_key": "a"}).status_code == 404
+        assert requests.get(url).status_code == 403
+        statuses = [requests.get(url, params={"api_key": "a", "names": "2012"}).status_code for _ in range(6)]
+        other_key = requests.get(url, params={"api_key": "b", "names": "2012"})
+    finally:
+        server.stop()
+
+    assert statuses[2:] == [429] * 4
+    assert set(statuses[:2]) <= {200, 503}
+    assert other_key.status_code in (200, 503)
+    assert sum(server.statuses.values()) == 7
+    limited = mock.MockNSRDB(config=mock.MockConfig(rate_limit_ratio=1.0))
+    assert limited.decide("a") == (429, 0.0)
+    limited.server_close()
+
+
+def test_mock_main_serves_until_interrupted(monkeypatch, capsys):
+    def _interrupt(self):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mock.MockNSRDB, "serve_forever", _interrupt)
+
+    assert mock.main(["--port", "0", "--latency", "0.1"]) == 0
+    assert "Serving mock NSRDB on http://127.0.0.1:" in capsys.readouterr().out
+
+
+def test_load_test_reports_every_level(tmp_path):
+    session = assets._session
+    results = load.run([1, 2], 3, config=mock.MockConfig(days=1), throttle_rate=100)
+
+    assert assets._session is session
+    assert [level["concurrency"] for level in results["levels"]] == [1, 2]
+    assert all(level["ok"] == 3 and level["errors"] == 0 for level in results["levels"])
+    assert all(level["p50"] <= level["p95"] <= level["p99"] for level in results["levels"])
+    assert results["statuses"] == {"200": 6}
+    assert "server responses: 200: 6" in load.report(results)
+
+
+def test_load_test_targets_a_running_server(tmp_path, capsys):
+    server = mock.MockNSRDB(config=mock.MockConfig(failure_ratio=1.0, days=1)).start()
+    try:
+        assert (
+            load.main(
+                ["--url", server.url, "--concurrency", "2", "--requests", "2", "--output", str(tmp_path / "out.json")]
+            )
+            == 0
+        )
+    finally:
+        server.stop()
+
+    results = json.loads((tmp_path / "out.json").read_text())
+    assert results["levels"][0]["errors"] == 2
+    assert results["levels"][0]["p99"] is None
+    assert results["statuses"] == {}
+    assert capsys.readouterr().out.splitlines()[1].split()[:3] == ["2", "0", "2"]
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from nlr_psm3_2_epw import cache
+
+
+def test_response_cache_roundtrip_and_stats(tmp_path):
+    store = cache.ResponseCache(tmp_path / "nested" / "cache.sqlite")
+
+    assert store.get("a") is None
+    store.put("a", b"x" * 1000)
+
+    assert store.get("a") == b"x" * 1000
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    # Entries are stored compressed
+    assert 0 < stats["bytes"] < 1000
+
+
+def test_response_cache_persists_across_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = cache.ResponseCache(path)
+    first.put("a", b"payload")
+    first.close()
+
+    assert cache.ResponseCache(path).get("a") == b"payload"
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+    # Incompressible payloads make the stored size predictable
+    blobs = {key: random.Random(key).randbytes(1024) for key in "abc"}
+    store = cache.ResponseCache(tmp_path / "cache.sqlite", max_bytes=2200)
+
+    store.put("a", blobs["a"])
+    store.put("b", blobs["b"])
+    store.get("a")
+    store.put("c", blobs["c"])
+
+    assert store.get("b") is None
+    assert store.get("a") == blobs["a"]
+    assert store.get("c") == blobs["c"]
+    assert store.stats()["evictions"] == 1
+
+
+def test_response_cache_expires_entries(tmp_path, monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cache.time, "time", lambda: now["t"])
+    store = cache.ResponseCache(tmp_path / "cache.sqlite", ttl=60)
+
+    store.put("a", b"payload")
+    now["t"] += 30
+    assert store.get("a") == b"payload"
+    now["t"] += 31
+    assert store.get("a") is None
+    assert store.stats()["entries"] == 0
+
+
+def test_response_cache_clear(tmp_path):
+    store = cache.ResponseCache(tmp_path / "cache.sqlite")
+    store.put("a", b"payload")
+    store.clear()
+    assert store.stats()["entries"] == 0
+
+
+def test_response_cache_in_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache.ResponseCache("cache.sqlite").put("a", b"payload")
+    assert (tmp_path / "cache.sqlite").exists()
+
+
+def test_response_cache_rejects_bad_size(tmp_path):
+    with pytest.raises(ValueError):
+        cache.ResponseCache(tmp_path / "cache.sqlite", max_bytes=0)
@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from nlr_psm3_2_epw import assets, cli, throttle
+
+
+class _Response:
+    ok = True
+    status_code = 200
+
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+
+
+@pytest.fixture
+def fake_nlr(monkeypatch, nsrdb_csv):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(dict(params))
+        if params["wkt"].startswith("POINT(99"):
+            raise assets.requests.exceptions.ConnectionError("unreachable")
+        return _Response(url, nsrdb_csv(rows=3))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    monkeypatch.setattr(throttle.random, "uniform", lambda low, high: 0.0)
+    return calls
+
+
+def test_cli_runs_csv_manifest(tmp_path, fake_nlr):
+    manifest = tmp_path / "sites.csv"
+    manifest.write_text("lon,lat,year,location,interval\n-84.38,33.77,2012,Atlanta,\n-73.98,40.75,tmy,NYC,30\n")
+    out_dir = tmp_path / "out"
+
+    result = CliRunner().invoke(
+        cli.main, [str(manifest), "-o", str(out_dir), "-j", "2", "--api-key", "key", "--rate", "1000"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "2 of 2 EPW files written" in result.output
+    assert len(list(out_dir.glob("*.epw"))) == 2
+    summary = json.loads((out_dir / "summary.json").read_text())
+    assert summary["succeeded"] == 2 and summary["failed"] == 0
+    assert [item["location"] for item in summary["items"]] == ["Atlanta", "NYC"]
+    assert all(item["elapsed"] >= 0 and item["file_name"].startswith(str(out_dir)) for item in summary["items"])
+    assert all(call["api_key"] == "key" for call in fake_nlr)
+
+
+def test_cli_runs_json_manifest_and_reports_failures(tmp_path, fake_nlr, monkeypatch):
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "defaults": {"year": 2012, "attributes": "ghi"},
+                "sites": [{"lon": 0, "lat": 0, "location": "Ok"}, {"lon": 99, "lat": 0, "location": "Down"}],
+            }
+        )
+    )
+    monkeypatch.setenv("NLR_API_KEY", "env-key")
+    summary_path = tmp_path / "reports" / "run.json"
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            str(manifest),
+            "-o",
+            str(tmp_path / "out"),
+            "--summary",
+            str(summary_path),
+            "--cache",
+            str(tmp_path / "cache.sqlite"),
+            "--grid",
+            str(tmp_path / "grid.json"),
+            "--max-attempts",
+            "1",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "Failed: Down 2012: ConnectionError: unreachable" in result.output
+    summary = json.loads(summary_path.read_text())
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+    assert summary["items"][0]["error"] is None
+    assert summary["items"][1]["file_name"] is None
+    assert all(call["api_key"] == "env-key" and call["attributes"] == "ghi" for call in fake_nlr)
+    assert (tmp_path / "grid.json").exists()
+
+
+def test_cli_requires_api_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("NLR_API_KEY", raising=False)
+    monkeypatch.delenv("APIKEY", raising=False)
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(json.dumps([{"lon": 0, "lat": 0, "year": 2012, "location": "A"}]))
+
+    result = CliRunner().invoke(cli.main, [str(manifest)])
+
+    assert result.exit_code == 2
+    assert "API key is required" in result.output
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        ([{"lon": 0, "lat": 0, "location": "A"}], "missing year"),
+        ([{"lon": 0, "lat": 0, "year": 2012, "location": "A", "colour": "red"}], "unknown fields colour"),
+        ({"defaults": {"colour": "red"}, "sites": []}, "Unknown manifest option 'colour'"),
+    ],
+)
+def test_cli_rejects_bad_manifest(tmp_path, content, message):
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(json.dumps(content))
+
+    result = CliRunner().invoke(cli.main, [str(manifest), "--api-key", "key"])
+
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+def test_cli_resumes_from_journal(tmp_path, fake_nlr):
+    manifest = tmp_path / "sites.csv"
+    manifest.write_text("lon,lat,year,location\n0,0,2012,Ok\n99,0,2012,Down\n")
+    args = [str(manifest), "-o", str(tmp_path / "out"), "--api-key", "key", "--rate", "1000", "--max-attempts", "2"]
+    args += ["--journal", str(tmp_path / "jobs.sqlite")]
+
+    first = CliRunner().invoke(cli.main, args)
+    assert first.exit_code == 1
+    # The unreachable site was retried once within the run
+    assert len(fake_nlr) == 3
+    assert json.loads((tmp_path / "out" / "summary.json").read_text())["retries"] == 1
+
+    second = CliRunner().invoke(cli.main, args)
+    assert second.exit_code == 1
+    assert "1 EPW files were already written by an earlier run" in second.output
+    # Only the failed item is requested again
+    assert len(fake_nlr) == 5
+    summary = json.loads((tmp_path / "out" / "summary.json").read_text())
+    assert (summary["total"], summary["skipped"]) == (1, 1)
+    assert summary["items"][0]["location"] == "Down"
+
+
+def test_cli_flags_win_over_manifest_defaults(tmp_path, fake_nlr, monkeypatch):
+    monkeypatch.delenv("NLR_API_KEY", raising=False)
+    monkeypatch.setenv("APIKEY", "app-key")
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "defaults": {"interval": "60", "attributes": "ghi", "api_key": "manifest-key"},
+                "sites": [{"lon": 0, "lat": 0, "year": 2012, "location": "A"}],
+            }
+        )
+    )
+
+    result = CliRunner().invoke(cli.main, [str(manifest), "-o", str(tmp_path), "--interval", "30", "--rate", "1000"])
+
+    assert result.exit_code == 0, result.output
+    # The explicit flag and the environment beat the manifest, which still beats the built-in defaults
+    assert fake_nlr[0]["interval"] == "30"
+    assert fake_nlr[0]["api_key"] == "app-key"
+    assert fake_nlr[0]["attributes"] == "ghi"
+
+
+def test_cli_journal_keeps_reporting_exhausted_items(tmp_path, fake_nlr):
+    manifest = tmp_path / "sites.csv"
+    manifest.write_text("lon,lat,year,location\n0,0,2012,Ok\n99,0,2012,Down\n")
+    args = [str(manifest), "-o", str(tmp_path / "out"), "--api-key", "key", "--rate", "1000", "--max-attempts", "1"]
+    args += ["--journal", str(tmp_path / "jobs.sqlite")]
+
+    for _ in range(4):
+        result = CliRunner().invoke(cli.main, args)
+        assert result.exit_code == 1
+    # The journal gives up after three runs, but the dead item still fails the job
+    assert len(fake_nlr) == 4
+    assert "Failed: Down 2012: ConnectionError: unreachable" in result.output
+    summary = json.loads((tmp_path / "out" / "summary.json").read_text())
+    assert (summary["failed"], summary["skipped"]) == (1, 1)
+    assert summary["items"][0]["attempts"] == 3
+
+
+def test_cli_journal_reruns_items_when_options_or_outputs_change(tmp_path, fake_nlr):
+    manifest = tmp_path / "sites.csv"
+    manifest.write_text("lon,lat,year,location\n0,0,2012,Ok\n")
+    out_dir = tmp_path / "out"
+    args = [str(manifest), "-o", str(out_dir), "--api-key", "key", "--rate", "1000"]
+    args += ["--journal", str(tmp_path / "jobs.sqlite")]
+
+    assert CliRunner().invoke(cli.main, args).exit_code == 0
+    assert "1 EPW files were already written" in CliRunner().invoke(cli.main, args).output
+    assert len(fake_nlr) == 1
+
+    # A different interval is a different file
+    assert CliRunner().invoke(cli.main, [*args, "--interval", "30"]).exit_code == 0
+    assert fake_nlr[-1]["interval"] == "30"
+
+    # A deleted output is downloaded again
+    for path in out_dir.glob("*.epw"):
+        path.unlink()
+    assert CliRunner().invoke(cli.main, args).exit_code == 0
+    assert len(fake_nlr) == 3
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from nlr_psm3_2_epw import assets, convert, epw
+
+
+def test_convert_csv_accepts_bytes_and_paths(tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=5, lat=40.5, lon=-105.25)
+    path = tmp_path / "site.csv"
+    path.write_bytes(content)
+
+    from_bytes = assets.convert_csv(content, "Site")
+    from_path = assets.convert_csv(str(path), "Site", lat=1, lon=2)
+
+    assert from_bytes.headers["LOCATION"][5:7] == ["40.5", "-105.25"]
+    assert from_path.headers["LOCATION"][5:7] == ["1", "2"]
+    assert from_bytes.dataframe.equals(from_path.dataframe)
+    assert from_bytes.dataframe.shape == (5, 35)
+
+
+def test_find_csv_files_accepts_directories_and_patterns(tmp_path):
+    for name in ("b.csv", "a.csv", "notes.txt", "nested/c.csv"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text("")
+
+    assert convert.find_csv_files(str(tmp_path)) == [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    assert convert.find_csv_files(str(tmp_path / "**" / "c.csv")) == [str(tmp_path / "nested" / "c.csv")]
+
+
+def test_convert_directory_converts_every_file_on_a_process_pool(tmp_path, nsrdb_csv):
+    source = tmp_path / "raw"
+    source.mkdir()
+    for i in range(5):
+        (source / f"site{i}.csv").write_bytes(nsrdb_csv(rows=4, location_id=i))
+    (source / "broken.csv").write_bytes(b"not,an\nnsrdb,csv\n")
+
+    results = list(convert.convert_directory(str(source), str(tmp_path / "epw"), max_workers=2, chunk_size=4))
+
+    assert len(results) == 6
+    failed = [result for result in results if not result.ok]
+    assert [result.source for result in failed] == [str(source / "broken.csv")]
+    assert failed[0].file_name is None
+    for result in results:
+        if result.ok:
+            out = epw.EPW()
+            out.read(result.file_name)
+            assert out.dataframe.shape == (4, 35)
+    assert sorted(p.name for p in (tmp_path / "epw").iterdir()) == [f"site{i}.epw" for i in range(5)]
+
+
+def test_convert_directory_keeps_files_with_the_same_name_apart(tmp_path, nsrdb_csv):
+    source = tmp_path / "raw"
+    for site, lat in (("siteA", 40.5), ("siteB", 41.5)):
+        (source / site).mkdir(parents=True)
+        (source / site / "2012.csv").write_bytes(nsrdb_csv(rows=4, lat=lat))
+
+    results = list(convert.convert_directory(str(source / "**" / "*.csv"), str(tmp_path / "epw"), max_workers=2))
+
+    assert all(result.ok for result in results)
+    assert sorted(result.file_name for result in results) == [
+        str(tmp_path / "epw" / "siteA" / "2012.epw"),
+        str(tmp_path / "epw" / "siteB" / "2012.epw"),
+    ]
+    for site, lat in (("siteA", "40.5"), ("siteB", "41.5")):
+        out = epw.EPW()
+        out.read(str(tmp_path / "epw" / site / "2012.epw"))
+        assert out.headers["LOCATION"][5] == lat
+
+
+def test_source_root_is_the_directory_before_the_first_wildcard(tmp_path):
+    assert convert.source_root(str(tmp_path)) == str(tmp_path)
+    assert convert.source_root(str(tmp_path / "raw" / "**" / "*.csv")) == str(tmp_path / "raw")
+    assert convert.source_root(os.path.join("raw", "site*", "*.csv")) == "raw"
+    assert convert.source_root("*.csv") == os.curdir
+
+
+def test_convert_chunk_reports_failures_per_file(tmp_path, nsrdb_csv):
+    good = tmp_path / "good.csv"
+    good.write_bytes(nsrdb_csv(rows=2))
+
+    results = convert._convert_chunk([str(good), str(tmp_path / "missing.csv")], str(tmp_path))
+
+    assert results[0] == (str(tmp_path / "good.epw"), None)
+    assert results[1][0] is None and isinstance(results[1][1], FileNotFoundError)
+
+
+def test_convert_directory_defaults_to_cpu_count(monkeypatch, tmp_path):
+    monkeypatch.setattr(convert.os, "cpu_count", lambda: None)
+
+    assert list(convert.convert_directory(str(tmp_path), str(tmp_path / "epw"))) == []
+
+
+@pytest.mark.parametrize("kwargs", [{"max_workers": 0}, {"chunk_size": 0}])
+def test_convert_directory_rejects_bad_arguments(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        list(convert.convert_directory(str(tmp_path), str(tmp_path), **kwargs))
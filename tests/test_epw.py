@@ -1,6 +1,11 @@
+import io
+import os
+
+import numpy as np
 import pandas as pd
+import pytest
 
-from nlr_psm3_2_epw import epw
+from nlr_psm3_2_epw import assets, epw
 
 
 def test_epw_read_write_roundtrip(tmp_path):
@@ -94,3 +99,378 @@ def test_epw_read_handles_empty_lines(tmp_path):
     df = loaded._read_data(file_path)
     assert not df.empty
     assert df["Year"].iloc[0] == 2020
+    pd.testing.assert_frame_equal(loaded._read_data(file_path, first_row), df)
+
+
+def _sample_epw():
+    out = epw.EPW()
+    out.headers = {"LOCATION": ["City", "State"], "DATA PERIODS": ["1"]}
+    out.dataframe = pd.DataFrame([[2020, 1, 1, 1, 0, "SOURCE", 20.5], [2020, 1, 1, 2, 0, "SOURCE", 21.0]])
+    return out
+
+
+def test_epw_to_bytes_matches_file_output(tmp_path):
+    out = _sample_epw()
+    file_path = tmp_path / "sample.epw"
+    out.write(file_path)
+
+    assert out.to_bytes() == file_path.read_bytes()
+
+
+def test_epw_write_to_streams():
+    out = _sample_epw()
+    expected = out.to_bytes()
+
+    text = io.StringIO(newline="")
+    out.write(text)
+    assert text.getvalue().encode() == expected
+
+    binary = io.BytesIO()
+    out.write(binary)
+    # Binary streams stay open and usable after writing
+    assert not binary.closed
+    assert binary.getvalue() == expected
+
+
+def test_epw_fixed_precision_writer_rounds_per_column():
+    out = epw.EPW()
+    out.headers = {"LOCATION": ["City"]}
+    out.dataframe = pd.DataFrame(
+        {
+            "Year": [2020, 2020],
+            "Dry Bulb Temperature": [20.04, -3.26],
+            "Global Horizontal Radiation": [199.6, 0.2],
+            "Albedo": [0.1712, float("nan")],
+            "Custom": [1.25, 2.5],
+            "Data Source and Uncertainty Flags": ["a,b", 'say "hi"'],
+            "Present Weather Codes": ["", ""],
+            "Aerosol Optical Depth": [0.999, 0.999],
+            "Flag": ["100%", "100%"],
+        }
+    )
+
+    lines = out.to_bytes(fixed_precision=True).decode().splitlines()
+
+    assert lines[1] == '2020,20.0,200,0.17,1.25,"a,b",,0.999,100%'
+    assert lines[2] == '2020,-3.3,0,,2.5,"say ""hi""",,0.999,100%'
+
+
+def test_epw_fixed_precision_writer_matches_default_for_integers(tmp_path):
+    out = _sample_epw()
+    out.dataframe = out.dataframe.drop(columns=[6])
+
+    assert out.to_bytes(fixed_precision=True) == out.to_bytes()
+
+    file_path = tmp_path / "fixed.epw"
+    out.write(file_path, fixed_precision=True)
+    assert file_path.read_bytes() == out.to_bytes()
+
+
+def test_epw_fixed_precision_writer_constant_and_empty_frames():
+    out = epw.EPW()
+    out.dataframe = pd.DataFrame({"Year": [2020, 2020], "Visibility": [9999.0, 9999.0]})
+    assert out.to_bytes(fixed_precision=True).decode().splitlines() == ["2020,9999"] * 2
+
+    out.dataframe = out.dataframe.iloc[:0]
+    assert out.to_bytes(fixed_precision=True) == b""
+
+
+def _write_sample_file(tmp_path):
+    frame = pd.DataFrame([[2020, 1, 1, h, 0, "SOURCE"] + [h + 0.5] * 29 for h in range(1, 4)], columns=epw.COLUMNS)
+    out = epw.EPW()
+    out.headers = {"LOCATION": ["City", "State"], "DATA PERIODS": ["1"]}
+    out.dataframe = frame
+    file_path = tmp_path / "sample.epw"
+    out.write(file_path)
+    return file_path
+
+
+@pytest.mark.parametrize("engine", ["c", "python"])
+def test_epw_read_applies_compact_dtypes(tmp_path, engine):
+    loaded = epw.EPW()
+    loaded.read(_write_sample_file(tmp_path), engine=engine)
+
+    assert loaded.headers["DATA PERIODS"] == ["1"]
+    assert loaded.dataframe["Year"].dtype == "int16"
+    assert loaded.dataframe["Hour"].dtype == "int8"
+    assert loaded.dataframe["Hour"].tolist() == [1, 2, 3]
+    assert loaded.dataframe["Dry Bulb Temperature"].tolist() == [1.5, 2.5, 3.5]
+
+
+def test_epw_read_projects_columns(tmp_path):
+    loaded = epw.EPW()
+    loaded.read(_write_sample_file(tmp_path), usecols=["Wind Speed", "Year"])
+
+    # Columns keep the file order regardless of the requested order
+    assert list(loaded.dataframe.columns) == ["Year", "Wind Speed"]
+    assert loaded.dataframe["Wind Speed"].tolist() == [1.5, 2.5, 3.5]
+
+    with pytest.raises(ValueError, match="Unknown epw columns"):
+        loaded.read(_write_sample_file(tmp_path), usecols=["Temperature"])
+
+
+def test_epw_read_with_pyarrow_engine(tmp_path):
+    pytest.importorskip("pyarrow")
+    file_path = _write_sample_file(tmp_path)
+
+    default = epw.EPW()
+    default.read(file_path, engine="c")
+    loaded = epw.EPW()
+    loaded.read(file_path, engine="pyarrow")
+
+    assert loaded.headers == default.headers
+    pd.testing.assert_frame_equal(loaded.dataframe, default.dataframe)
+
+
+def test_epw_default_engine_prefers_pyarrow(monkeypatch):
+    monkeypatch.setattr(epw.importlib.util, "find_spec", lambda name: object())
+    assert epw._default_engine() == "pyarrow"
+    monkeypatch.setattr(epw.importlib.util, "find_spec", lambda name: None)
+    assert epw._default_engine() == "c"
+
+
+def test_epw_read_headers_only_file(tmp_path):
+    file_path = tmp_path / "headers.epw"
+    file_path.write_text("LOCATION,City\n")
+
+    loaded = epw.EPW()
+    with open(file_path, "rb") as f:
+        assert loaded._read_headers_from(f) == {"LOCATION": ["City"]}
+
+
+@pytest.mark.parametrize("fixed_precision", [False, True])
+def test_epw_columnar_sidecar_roundtrip_is_lossless(tmp_path, fixed_precision):
+    source = epw.EPW()
+    source.read(_write_sample_file(tmp_path))
+    source.dataframe["Dry Bulb Temperature"] = [0.1 + 0.2, -1e-300, float("nan")]
+    source.write_columnar(tmp_path / "sidecar")
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar")
+
+    assert loaded.headers == source.headers
+    pd.testing.assert_frame_equal(loaded.dataframe, source.dataframe)
+    assert loaded.to_bytes(fixed_precision) == source.to_bytes(fixed_precision)
+
+
+def test_epw_columnar_sidecar_maps_numeric_columns(tmp_path):
+    source = epw.EPW()
+    source.read(_write_sample_file(tmp_path))
+    source.write_columnar(tmp_path / "sidecar")
+
+    mapped = epw.EPW()
+    mapped.read_columnar(tmp_path / "sidecar")
+    # Mapped columns are read-only views of the sidecar files rather than copies
+    assert not mapped.dataframe["Year"].values.flags.writeable
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar", mmap=False)
+    assert loaded.dataframe["Year"].values.flags.writeable
+    pd.testing.assert_frame_equal(loaded.dataframe, mapped.dataframe)
+
+
+def test_epw_columnar_sidecar_restores_missing_text(tmp_path):
+    source = epw.EPW()
+    source.headers = {"LOCATION": ["City"]}
+    source.dataframe = pd.DataFrame({"Year": [2020, 2021], "Data Source and Uncertainty Flags": ["A,B", None]})
+    source.write_columnar(tmp_path / "sidecar")
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar")
+
+    assert loaded.dataframe["Data Source and Uncertainty Flags"].tolist()[0] == "A,B"
+    assert pd.isna(loaded.dataframe["Data Source and Uncertainty Flags"].tolist()[1])
+    assert loaded.to_bytes() == source.to_bytes()
+
+
+def test_epw_columnar_sidecar_rewrite_replaces_the_directory(tmp_path):
+    source = epw.EPW()
+    source.headers = {"LOCATION": ["City"]}
+    source.dataframe = pd.DataFrame({"Year": [2020, 2021], "Flags": ["A", None]})
+    source.write_columnar(tmp_path / "sidecar")
+
+    source.dataframe = pd.DataFrame({"Year": [2022], "Flags": ["B"]})
+    source.write_columnar(tmp_path / "sidecar")
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar")
+    assert loaded.dataframe["Year"].tolist() == [2022]
+    # Nothing from the previous sidecar or the temporary directories is left behind
+    assert sorted(p.name for p in (tmp_path / "sidecar").iterdir()) == ["0.npy", "1.npy", "headers.json"]
+    assert [p.name for p in tmp_path.iterdir()] == ["sidecar"]
+
+
+def test_epw_columnar_sidecar_failed_write_keeps_previous_sidecar(tmp_path, monkeypatch):
+    source = epw.EPW()
+    source.headers = {"LOCATION": ["City"]}
+    source.dataframe = pd.DataFrame({"Year": [2020]})
+    source.write_columnar(tmp_path / "sidecar")
+
+    def _fail(*_args, **_kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(epw.np, "save", _fail)
+    with pytest.raises(OSError, match="disk full"):
+        source.write_columnar(tmp_path / "sidecar")
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar")
+    assert loaded.dataframe["Year"].tolist() == [2020]
+    assert [p.name for p in tmp_path.iterdir()] == ["sidecar"]
+
+
+def test_epw_columnar_sidecar_failed_swap_restores_previous_sidecar(tmp_path, monkeypatch):
+    source = epw.EPW()
+    source.headers = {"LOCATION": ["City"]}
+    source.dataframe = pd.DataFrame({"Year": [2020]})
+    source.write_columnar(tmp_path / "sidecar")
+    replace = os.replace
+
+    def _fail_swap(src, dst):
+        # Moving the old sidecar aside works, moving the new one into place does not
+        if os.path.basename(src).startswith(".sidecar.") and ".old." not in os.path.basename(src):
+            raise OSError("rename failed")
+        replace(src, dst)
+
+    monkeypatch.setattr(epw.os, "replace", _fail_swap)
+    source.dataframe = pd.DataFrame({"Year": [2021]})
+    with pytest.raises(OSError, match="rename failed"):
+        source.write_columnar(tmp_path / "sidecar")
+
+    loaded = epw.EPW()
+    loaded.read_columnar(tmp_path / "sidecar")
+    assert loaded.dataframe["Year"].tolist() == [2020]
+    assert [p.name for p in tmp_path.iterdir()] == ["sidecar"]
+
+
+def test_compact_frame_keeps_fixed_precision_output_and_shrinks_memory(nsrdb_csv):
+    out = assets.convert_csv(nsrdb_csv(rows=500), "Loc")
+    expected = out.to_bytes(fixed_precision=True)
+    before = out.memory_usage().loc["Total", "bytes"]
+
+    out.compact()
+
+    assert out.to_bytes(fixed_precision=True) == expected
+    report = out.memory_usage()
+    assert report.loc["Total", "bytes"] * 5 < before
+    assert report.loc["Dry Bulb Temperature", "dtype"] == "float32"
+    assert report.loc["Global Horizontal Radiation", "dtype"] == "int16"
+    assert report.loc["Visibility", "dtype"] == "category"
+    # Compacting again leaves categoricals alone
+    out.compact()
+    assert out.to_bytes(fixed_precision=True) == expected
+
+
+def test_compact_frame_keeps_constant_numeric_columns_numeric(tmp_path, nsrdb_csv):
+    path = tmp_path / "site.epw"
+    # A single-year hourly file: Year and Minute hold one value in every row
+    assets.convert_csv(nsrdb_csv(rows=48), "Loc").write(str(path), fixed_precision=True)
+    full = epw.EPW()
+    full.read(str(path))
+    compact = epw.EPW()
+    compact.read(str(path), compact=True)
+    df = compact.dataframe
+
+    assert df["Year"].dtype == "int16"
+    assert df["Minute"].dtype == "int8"
+    assert df["Year"].mean() == 2012
+    assert (df["Minute"] + 1).eq(1).all()
+    assert (df["Dry Bulb Temperature"] * 2).tolist() == pytest.approx(
+        (full.dataframe["Dry Bulb Temperature"] * 2).tolist()
+    )
+    numeric = [name for name in full.dataframe.columns if full.dataframe[name].dtype.kind in "iuf"]
+    expected = full.dataframe[[name for name in numeric if name not in epw.MISSING_VALUES]]
+    assert df[expected.columns].sum().tolist() == pytest.approx(expected.sum().tolist())
+    # Only text columns and the missing-value placeholders become categoricals
+    categorical = [name for name in df.columns if isinstance(df[name].dtype, pd.CategoricalDtype)]
+    assert set(categorical) <= set(epw.MISSING_VALUES) | {
+        name for name in full.dataframe if full.dataframe[name].dtype == object
+    }
+    assert "Visibility" in categorical
+
+
+def test_compact_frame_keeps_real_data_in_placeholder_columns_numeric():
+    compact = epw.compact_frame(pd.DataFrame({"Visibility": [9999, 9999], "Snow Depth": [5, 5]}))
+
+    assert compact["Visibility"].dtype == "category"
+    assert compact["Snow Depth"].dtype == "int8"
+    assert compact["Snow Depth"].sum() == 10
+
+
+def test_compact_frame_handles_missing_values_and_wide_ranges():
+    df = pd.DataFrame(
+        {
+            "Month": [1, 2, 3],
+            "Hour": [1.0, np.nan, 3.0],
+            "Relative Humidity": [50.4, np.nan, 70.6],
+            "Atmospheric Station Pressure": [101325, 90000, 3_000_000_000],
+            "Zenith Luminance": [1, 2, 40000],
+            "Extra": [1.5, 2.5, 3.5],
+        }
+    )
+
+    compact = epw.compact_frame(df)
+
+    assert compact.dtypes.astype(str).tolist() == ["int8", "float64", "float32", "int64", "int32", "float64"]
+    assert compact["Relative Humidity"].tolist()[::2] == [50.0, 71.0]
+    assert epw.compact_frame(df.iloc[:0]).shape == (0, 6)
+
+
+def test_read_compact(tmp_path, nsrdb_csv):
+    path = tmp_path / "site.epw"
+    assets.convert_csv(nsrdb_csv(rows=48), "Loc").write(str(path), fixed_precision=True)
+
+    out = epw.EPW()
+    out.read(str(path), compact=True)
+
+    assert out.dataframe["Visibility"].dtype == "category"
+    assert out.to_bytes(fixed_precision=True) == path.read_bytes()
+
+
+@pytest.fixture
+def epw_path(tmp_path, nsrdb_csv):
+    path = tmp_path / "site.epw"
+    assets.convert_csv(nsrdb_csv(rows=48), "Loc").write(str(path), fixed_precision=True)
+    return path
+
+
+def test_lazy_read_loads_columns_on_first_access(monkeypatch, epw_path):
+    eager = epw.EPW()
+    eager.read(str(epw_path))
+    loads = []
+    read_data = epw.EPW._read_data_from
+
+    def _counting(self, f, usecols=None, engine=None):
+        loads.append(list(usecols))
+        return read_data(self, f, usecols=usecols, engine=engine)
+
+    monkeypatch.setattr(epw.EPW, "_read_data_from", _counting)
+    lazy = epw.EPW()
+    lazy.read(str(epw_path), lazy=True)
+
+    assert lazy.headers == eager.headers
+    assert loads == []
+    assert lazy.column("Dry Bulb Temperature").equals(eager.dataframe["Dry Bulb Temperature"])
+    lazy.column("Dry Bulb Temperature")
+    assert loads == [["Dry Bulb Temperature"]]
+
+    pd.testing.assert_frame_equal(lazy.dataframe, eager.dataframe)
+    assert loads[1] == [name for name in epw.COLUMNS if name != "Dry Bulb Temperature"]
+    # Once loaded, columns come from the frame
+    assert lazy.column("Year").equals(eager.dataframe["Year"])
+    assert len(loads) == 2
+
+
+def test_lazy_read_loads_everything_once_all_columns_were_accessed(epw_path):
+    lazy = epw.EPW()
+    lazy.read(str(epw_path), lazy=True, compact=True)
+    for name in epw.COLUMNS:
+        lazy.column(name)
+
+    assert lazy.dataframe["Visibility"].dtype == "category"
+    assert lazy.to_bytes(fixed_precision=True) == epw_path.read_bytes()
+
+
+def test_lazy_read_rejects_usecols(epw_path):
+    with pytest.raises(ValueError, match="usecols"):
+        epw.EPW().read(str(epw_path), usecols=["Year"], lazy=True)
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from nlr_psm3_2_epw import grid
+
+
+def test_grid_index_groups_nearby_coordinates():
+    index = grid.GridIndex()
+
+    # Two buildings ~50 m apart share a cell, a site 5 km away does not
+    assert index.cell_id(33.7701, -84.3824) == index.cell_id(33.7705, -84.3820)
+    assert index.cell_id(33.7701, -84.3824) != index.cell_id(33.8151, -84.3824)
+    assert index.snap(33.7701, -84.3824) == index.snap("33.7705", "-84.3820")
+
+
+def test_grid_index_snaps_to_cell_center():
+    index = grid.GridIndex(resolution=grid.PSM3_RESOLUTION)
+    lat, lon = index.snap(33.77, -84.38)
+    assert lat == pytest.approx(33.78)
+    assert lon == pytest.approx(-84.38)
+    # Points on a cell edge stay in the upper cell despite float error
+    assert index.cell_id(0.04, 0) == "0.04:2251:4500"
+
+
+def test_grid_index_records_and_persists_location_ids(tmp_path):
+    path = tmp_path / "grid.json"
+    index = grid.GridIndex(path)
+    index.record(index.cell_id(33.77, -84.38), 123)
+    index.save()
+
+    reloaded = grid.GridIndex(path)
+    assert len(reloaded) == 1
+    assert reloaded.location_id(33.7701, -84.3799) == "123"
+    assert reloaded.location_id(0, 0) is None
+
+    # An index saved at another resolution does not apply
+    assert len(grid.GridIndex(path, resolution=grid.PSM3_RESOLUTION)) == 0
+
+
+def test_grid_index_save_requires_path():
+    with pytest.raises(ValueError):
+        grid.GridIndex().save()
+
+
+def test_grid_index_rejects_bad_resolution():
+    with pytest.raises(ValueError):
+        grid.GridIndex(resolution=0)
+
+
+def test_grid_index_reports_no_location_id_for_conflicting_cells(tmp_path):
+    path = tmp_path / "grid.json"
+    index = grid.GridIndex(path)
+    cell = index.cell_id(33.77, -84.38)
+    index.record(cell, 123)
+    index.record(cell, 123)
+    assert index.location_id(33.77, -84.38) == "123"
+
+    # Another site in the same cell resolved to the neighbouring pixel
+    index.record(cell, 124)
+    assert index.location_id(33.77, -84.38) is None
+    assert index.location_ids(33.77, -84.38) == ["123", "124"]
+    assert index.conflicts() == {cell: ["123", "124"]}
+
+    index.save()
+    assert grid.GridIndex(path).conflicts() == {cell: ["123", "124"]}
+
+
+def test_grid_index_loads_single_ids_of_older_indexes(tmp_path):
+    path = tmp_path / "grid.json"
+    index = grid.GridIndex()
+    path.write_text(json.dumps({"resolution": index.resolution, "locations": {index.cell_id(0, 0): "7"}}))
+
+    assert grid.GridIndex(path).location_id(0, 0) == "7"
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from nlr_psm3_2_epw import assets, cache, instrument
+
+from .test_assets_unit import DummyResponse, StreamingResponse
+
+OPTIONS = ("ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+
+def _serve(monkeypatch, content, status_code=200):
+    def _fake_request(_method, url, stream=False, **_kwargs):
+        if stream:
+            return StreamingResponse(url, content)
+        return DummyResponse(ok=status_code == 200, url=url, status_code=status_code, content=content)
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+
+
+def test_download_epw_reports_every_stage(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=24)
+    _serve(monkeypatch, content)
+    events = []
+
+    file_name = assets.download_epw(0, 0, 2012, "Loc", *OPTIONS, output_dir=str(tmp_path), hook=events.append)
+
+    assert [event.stage for event in events] == ["request", "parse", "transform", "write", "total"]
+    stages = {event.stage: event for event in events}
+    assert stages["request"].status == 200
+    assert stages["request"].retries == 0
+    assert stages["request"].bytes == len(content)
+    assert stages["parse"].bytes == len(content)
+    assert stages["parse"].rows == 24
+    assert stages["transform"].rows == 24
+    assert stages["write"].bytes == os.path.getsize(file_name)
+    assert all(event.seconds >= 0 and event.error is None for event in events)
+    assert all(event.request == {"lon": 0, "lat": 0, "year": 2012, "location": "Loc"} for event in events)
+
+
+def test_fetch_epw_reports_cache_status(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=3)
+    _serve(monkeypatch, content)
+    store = cache.ResponseCache(tmp_path / "cache.sqlite")
+    events = []
+
+    for _ in range(2):
+        assets.fetch_epw(0, 0, 2012, "Loc", *OPTIONS, cache=store, hook=events.append)
+
+    lookups = [(event.cache, event.bytes) for event in events if event.stage == "cache"]
+    assert lookups == [("miss", None), ("hit", len(content))]
+    assert [event.stage for event in events].count("request") == 1
+
+
+def test_stage_errors_are_reported(monkeypatch):
+    _serve(monkeypatch, b"", status_code=500)
+    events = []
+
+    with pytest.raises(RuntimeError):
+        assets.fetch_epw(0, 0, 2012, "Loc", *OPTIONS, hook=events.append)
+
+    assert [event.stage for event in events] == ["request", "total"]
+    assert events[0].status == 500
+    assert events[0].error.startswith("RuntimeError: NLR request failed (500)")
+    assert events[1].error.startswith("RuntimeError: ")
+
+
+def test_stream_epw_reports_stream_stage(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=24)
+    _serve(monkeypatch, content)
+    events = []
+
+    file_name = assets.stream_epw(
+        0, 0, 2012, "Loc", *OPTIONS, output_dir=str(tmp_path), chunk_rows=10, hook=events.append
+    )
+
+    stages = ["request", "transform", "transform", "transform", "write", "stream", "total"]
+    assert [event.stage for event in events] == stages
+    assert events[0].bytes is None
+    assert 0 < events[-3].seconds <= events[-2].seconds
+    assert events[-3].bytes == os.path.getsize(file_name)
+    assert events[-2].rows == 24
+    assert events[-2].bytes == len(content)
+
+
+def test_stages_without_hook_report_nothing():
+    events = []
+
+    with instrument.stage("parse") as record:
+        record.rows = 1
+    instrument.report("write", 1.0, bytes=1)
+    with instrument.instrumented(None, year=2012):
+        with instrument.stage("parse"):
+            pass
+
+    assert events == []
+
+
+def test_nested_instrumented_blocks_report_to_the_outer_hook():
+    outer, inner = [], []
+
+    with instrument.instrumented(outer.append, year=2012):
+        with instrument.instrumented(inner.append, year=2013):
+            with instrument.stage("parse"):
+                pass
+
+    assert [(event.stage, event.request) for event in outer] == [("parse", {"year": 2012}), ("total", {"year": 2012})]
+    assert inner == []
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+
+import pytest
+
+from nlr_psm3_2_epw import assets, journal
+
+
+def _specs(count):
+    return [{"lon": i, "lat": i, "year": 2012, "location": f"Site{i}"} for i in range(count)]
+
+
+def _fake_download(fail=()):
+    def _download(**kwargs):
+        if kwargs["location"] in fail:
+            raise RuntimeError("quota exceeded")
+        path = f"{kwargs['output_dir']}/{kwargs['location']}.epw"
+        with open(path, "w") as f:
+            f.write(kwargs["location"])
+        return path
+
+    return _download
+
+
+def test_job_journal_adds_each_spec_once(tmp_path):
+    jobs = journal.JobJournal(tmp_path / "nested" / "jobs.sqlite")
+
+    assert jobs.add(_specs(3)) == 3
+    # The key does not depend on field order, so re-adding a manifest is a no-op
+    assert jobs.add([{"location": "Site0", "year": 2012, "lat": 0, "lon": 0}]) == 0
+    assert jobs.counts() == {"pending": 3, "running": 0, "done": 0, "failed": 0}
+    assert [item["spec"]["location"] for item in jobs.items()] == ["Site0", "Site1", "Site2"]
+
+
+def test_job_journal_records_outcomes_and_retries_failures(tmp_path):
+    jobs = journal.JobJournal(tmp_path / "jobs.sqlite", max_attempts=2)
+    jobs.add(_specs(2))
+    output = tmp_path / "site.epw"
+    output.write_text("data")
+
+    first = jobs.claim("w1")
+    second = jobs.claim("w1")
+    assert jobs.claim("w1") is None
+    jobs.complete(first[1], str(output))
+    jobs.fail(second[1], "boom")
+
+    done, failed = jobs.items()
+    assert (done["status"], done["attempts"], done["output_path"]) == ("done", 1, str(output))
+    assert done["checksum"] == hashlib.sha256(b"data").hexdigest()
+    assert (failed["status"], failed["error"]) == ("failed", "boom")
+
+    # Failed items are retried until they run out of attempts
+    assert jobs.claim("w1", failed_before=float("inf"))[1] == second[1]
+    jobs.fail(second[1], "boom")
+    assert jobs.claim("w1", failed_before=float("inf")) is None
+
+    assert jobs.reset_failed() == 1
+    assert jobs.claim("w1")[1] == second[1]
+
+
+def test_job_journal_reclaims_expired_leases(tmp_path, monkeypatch):
+    clock = iter([0, 0, 5, 20])
+    monkeypatch.setattr(journal.time, "time", lambda: next(clock))
+    jobs = journal.JobJournal(tmp_path / "jobs.sqlite", lease=10)
+    jobs.add(_specs(1))
+
+    key = jobs.claim("dead-worker")[1]
+    assert jobs.claim("w2") is None
+    assert jobs.claim("w2")[1] == key
+
+
+def test_job_journal_claims_are_exclusive_across_connections(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    journal.JobJournal(path).add(_specs(50))
+    claimed = []
+    lock = threading.Lock()
+
+    def _worker(name):
+        # Separate connections lock the database like separate processes do
+        jobs = journal.JobJournal(path)
+        while (item := jobs.claim(name)) is not None:
+            with lock:
+                claimed.append(item[1])
+        jobs.close()
+
+    threads = [threading.Thread(target=_worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == len(set(claimed)) == 50
+
+
+def test_job_journal_run_resumes_after_failures(tmp_path, monkeypatch):
+    jobs = journal.JobJournal(tmp_path / "jobs.sqlite")
+    jobs.add(_specs(4))
+
+    monkeypatch.setattr(assets, "download_epw", _fake_download(fail={"Site2"}))
+    results = list(jobs.run(max_workers=2, output_dir=str(tmp_path)))
+    assert sorted(r.index for r in results) == [0, 1, 2, 3]
+    assert [r.ok for r in sorted(results)] == [True, True, False, True]
+    assert jobs.counts()["done"] == 3
+
+    # A restart only retries the failed item
+    monkeypatch.setattr(assets, "download_epw", _fake_download())
+    results = list(jobs.run(max_workers=2, worker="w1", output_dir=str(tmp_path)))
+    assert [(r.index, r.spec["location"]) for r in results] == [(2, "Site2")]
+    assert jobs.counts() == {"pending": 0, "running": 0, "done": 4, "failed": 0}
+
+
+def test_job_journal_rejects_bad_limits(tmp_path):
+    with pytest.raises(ValueError):
+        journal.JobJournal(tmp_path / "jobs.sqlite", max_attempts=0)
+
+
+def test_job_key_covers_the_shared_options_that_define_the_file():
+    site = {"lon": 0, "lat": 0, "location": "A"}
+
+    base = journal.job_key(site, {"year": 2012, "interval": "60", "api_key": "a", "output_dir": "out"})
+
+    # Credentials do not matter, and CSV strings match JSON numbers
+    assert base == journal.job_key({**site, "year": "2012"}, {"interval": "60", "api_key": "b", "output_dir": "out"})
+    assert base != journal.job_key(site, {"year": 2012, "interval": "30", "output_dir": "out"})
+    assert base != journal.job_key(site, {"year": 2012, "interval": "60", "output_dir": "other"})
+
+
+def test_job_journal_runs_items_with_the_options_they_were_added_with(tmp_path, monkeypatch):
+    jobs = journal.JobJournal(tmp_path / "jobs.sqlite")
+    calls = []
+
+    def _download(**kwargs):
+        calls.append(kwargs["interval"])
+        return _fake_download()(**kwargs)
+
+    monkeypatch.setattr(assets, "download_epw", _download)
+
+    assert jobs.add(_specs(1), interval="60", output_dir=str(tmp_path)) == 1
+    assert jobs.add(_specs(1), interval="30", output_dir=str(tmp_path)) == 1
+    list(jobs.run(interval="5"))
+
+    assert sorted(calls) == ["30", "60"]
+
+
+def test_job_journal_verify_requeues_changed_outputs(tmp_path, monkeypatch):
+    jobs = journal.JobJournal(tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(assets, "download_epw", _fake_download(fail={"Site2"}))
+    jobs.add(_specs(3), output_dir=str(tmp_path))
+    list(jobs.run())
+
+    assert jobs.verify() == 0
+    (tmp_path / "Site0.epw").write_text("edited")
+    (tmp_path / "Site1.epw").unlink()
+
+    keys = [journal.job_key(spec, {"output_dir": str(tmp_path)}) for spec in _specs(3)]
+    assert jobs.verify(keys[:1]) == 1
+    assert jobs.verify() == 1
+    assert [item["status"] for item in jobs.items(keys)] == ["pending", "pending", "failed"]
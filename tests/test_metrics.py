@@ -0,0 +1,180 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+import requests
+
+from nlr_psm3_2_epw import assets, cache, instrument, metrics, throttle
+
+from .test_assets_unit import DummyResponse, StreamingResponse
+
+OPTIONS = ("ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+
+def test_counter_renders_labelled_samples():
+    registry = metrics.MetricsRegistry()
+    counter = registry.counter("jobs_total", 'Jobs "done".\nPer status.', ("status",))
+    counter.inc(status="ok")
+    counter.inc(2.5, status='a"b\\c')
+
+    assert counter.value(status="ok") == 1
+    assert registry.render() == (
+        '# HELP jobs_total Jobs \\"done\\".\\nPer status.\n'
+        "# TYPE jobs_total counter\n"
+        'jobs_total{status="a\\"b\\\\c"} 2.5\n'
+        'jobs_total{status="ok"} 1\n'
+    )
+
+
+def test_counter_rejects_bad_updates():
+    counter = metrics.Counter("jobs_total", "Jobs.", ("status",))
+
+    with pytest.raises(ValueError, match="only increase"):
+        counter.inc(-1, status="ok")
+    with pytest.raises(ValueError, match="takes the labels"):
+        counter.inc(stage="ok")
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("latency_seconds", "Latency.", buckets=(1, 0.5))
+    for value in (0.2, 0.7, 3):
+        histogram.observe(value)
+
+    assert histogram.buckets == (0.5, 1.0, float("inf"))
+    assert histogram.count() == 3
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.5"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 3.9",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_histogram_validation():
+    with pytest.raises(ValueError, match="le"):
+        metrics.Histogram("h", "H.", ("le",))
+    with pytest.raises(ValueError, match="at least one bucket"):
+        metrics.Histogram("h", "H.", buckets=())
+    assert metrics.Histogram("h", "H.", buckets=(1, float("inf"))).buckets == (1.0, float("inf"))
+    assert metrics.Histogram("h", "H.").count() == 0
+    assert metrics._format_value(float("-inf")) == "-Inf"
+
+
+def test_registry_rejects_duplicate_names():
+    registry = metrics.MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.")
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.histogram("jobs_total", "Jobs.")
+
+
+def test_counters_are_thread_safe():
+    counter = metrics.Counter("jobs_total", "Jobs.")
+    threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value() == 8000
+
+
+def test_endpoint_from_request_year():
+    assert metrics.endpoint({"year": 2012}) == "aggregated"
+    assert metrics.endpoint({"year": "tmy-2022"}) == "tmy"
+    assert metrics.endpoint({}) == "unknown"
+
+
+def test_pipeline_metrics_collect_download_stages(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=3)
+    statuses = iter([503, 200, 200])
+
+    def _fake_request(_method, url, **_kwargs):
+        status = next(statuses)
+        response = DummyResponse(ok=status == 200, url=url, status_code=status, content=content)
+        response.headers = {}
+        return response
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    monkeypatch.setattr(throttle.time, "sleep", lambda _seconds: None)
+    hook = metrics.PipelineMetrics()
+    store = cache.ResponseCache(tmp_path / "cache.sqlite")
+    retrying = throttle.Throttle(limiter=throttle.RateLimiter(rate=1000, burst=10))
+
+    for year in (2012, 2012, "tmy-2022"):
+        assets.download_epw(
+            0, 0, year, "Loc", *OPTIONS, cache=store, throttle=retrying, output_dir=str(tmp_path), hook=hook
+        )
+
+    assert hook.request_seconds.count(endpoint="aggregated") == 1
+    assert hook.request_seconds.count(endpoint="tmy") == 1
+    assert hook.responses.value(endpoint="aggregated", status="200") == 1
+    assert hook.response_bytes.value(endpoint="tmy") == len(content)
+    assert hook.retries.value(endpoint="aggregated") == 1
+    assert hook.retries.value(endpoint="tmy") == 0
+    assert hook.cache_lookups.value(result="hit") == 1
+    assert hook.cache_lookups.value(result="miss") == 2
+    assert hook.write_seconds.count() == 3
+    assert hook.total_seconds.count(endpoint="aggregated") == 2
+    assert "nlr_request_retries_total" in hook.registry.render()
+
+
+def test_pipeline_metrics_cover_streamed_downloads(monkeypatch, tmp_path, nsrdb_csv):
+    content = nsrdb_csv(rows=24)
+
+    def _fake_request(_method, url, **_kwargs):
+        return StreamingResponse(url, content)
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    hook = metrics.PipelineMetrics()
+
+    assets.stream_epw(0, 0, "tmy-2022", "Loc", *OPTIONS, output_dir=str(tmp_path), chunk_rows=10, hook=hook)
+
+    assert hook.response_bytes.value(endpoint="tmy") == len(content)
+    assert hook.write_seconds.count() == 1
+    assert hook.responses.value(endpoint="tmy", status="200") == 1
+
+
+def test_pipeline_metrics_count_errors(monkeypatch):
+    def _fake_request(*_args, **_kwargs):
+        raise requests.exceptions.ConnectionError("down")
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    hook = metrics.PipelineMetrics()
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        assets.fetch_epw(0, 0, 2012, "Loc", *OPTIONS, hook=hook)
+
+    assert hook.errors.value(stage="request") == 1
+    assert hook.errors.value(stage="total") == 1
+    assert hook.request_seconds.count(endpoint="aggregated") == 1
+    assert "nlr_responses_total" not in [line.split("{")[0] for line in hook.registry.render().splitlines()]
+
+
+def test_pipeline_metrics_ignore_other_stages():
+    hook = metrics.PipelineMetrics()
+
+    with instrument.instrumented(hook):
+        with instrument.stage("parse"):
+            pass
+
+    assert hook.total_seconds.count(endpoint="unknown") == 1
+
+
+def test_serve_metrics_exposes_registry():
+    registry = metrics.MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.").inc()
+    server = metrics.serve_metrics(registry, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert response.read().decode() == registry.render()
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{base}/other")
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,140 @@
+import pytest
+
+from nlr_psm3_2_epw import assets, cache, multipoint
+
+from .conftest import DATA_COLUMNS, METADATA_COLUMNS, build_nsrdb_csv
+from .test_assets_unit import DummyResponse
+
+OPTIONS = ("ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+
+def build_multipoint_csv(locations, rows=3):
+    """Builds a multi-location response from `(location_id, lat, lon)` tuples."""
+    lines = [",".join(METADATA_COLUMNS)]
+    for location_id, lat, lon in locations:
+        lines.append(",".join(["NSRDB", str(location_id), "-", "-", "-", str(lat), str(lon), "0", "20", "-5"]))
+    lines.append(",".join(DATA_COLUMNS + ["Location ID"]))
+    for location_id, lat, lon in locations:
+        data = build_nsrdb_csv(rows=rows, location_id=location_id).decode().splitlines()[3:]
+        lines.extend(f"{line},{location_id}" for line in data)
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_fetch_epw_multipoint_demultiplexes_by_location_id(monkeypatch):
+    calls = []
+    response = build_multipoint_csv([(1, 40.0, -105.0), (2, 40.04, -105.04)])
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["wkt"])
+        return DummyResponse(ok=True, url=url, content=response)
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    sites = [
+        {"lon": -105.041, "lat": 40.039, "location": "B"},
+        {"lon": -105.001, "lat": 40.001, "location": "A"},
+        {"lon": -105.039, "lat": 40.041, "location": "C"},
+    ]
+
+    out = multipoint.fetch_epw_multipoint(sites, 2012, *OPTIONS)
+
+    # One request for all sites, ordered so that neighbours are grouped together
+    assert calls == ["MULTIPOINT(-105.001 40.001, -105.041 40.039, -105.039 40.041)"]
+    assert [weather.headers["LOCATION"][0] for weather in out] == ["B", "A", "C"]
+    assert [weather.headers["LOCATION"][5] for weather in out] == ["40.039", "40.001", "40.041"]
+    assert all(weather.dataframe.shape == (3, 35) for weather in out)
+
+
+def test_fetch_epw_multipoint_splits_requests_and_uses_point_for_single_sites(monkeypatch, tmp_path):
+    calls = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        calls.append(params["wkt"])
+        if params["wkt"].startswith("POINT"):
+            return DummyResponse(ok=True, url=url, content=build_nsrdb_csv(rows=3, location_id=9, lat=10, lon=20))
+        return DummyResponse(ok=True, url=url, content=build_multipoint_csv([(1, 0, 0), (2, 0, 1)]))
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    sites = [{"lon": 0, "lat": 0, "location": "A"}, {"lon": 1, "lat": 0, "location": "B"}]
+    sites.append({"lon": 20, "lat": 10, "location": "C"})
+
+    file_names = multipoint.download_epw_multipoint(
+        sites,
+        2012,
+        *OPTIONS,
+        points_per_request=2,
+        output_dir=str(tmp_path),
+        cache=cache.ResponseCache(str(tmp_path / "cache.sqlite")),
+    )
+
+    assert calls == ["MULTIPOINT(0 0, 1 0)", "POINT(20 10)"]
+    assert [name.split("_")[-2] for name in file_names] == ["2012"] * 3
+    assert [tmp_path.joinpath(name).exists() for name in file_names] == [True] * 3
+
+
+def test_fetch_epw_multipoint_rejects_bad_points_per_request():
+    with pytest.raises(ValueError, match="points_per_request"):
+        multipoint.fetch_epw_multipoint([], 2012, *OPTIONS, points_per_request=0)
+
+
+def test_fetch_epw_multipoint_reports_locations_without_data(monkeypatch):
+    # Location 7 is listed in the metadata but has no data rows
+    lines = build_multipoint_csv([(1, 0, 0), (7, 0, 0.01)]).split(b"\n")
+    response = b"\n".join(line for line in lines if not line.endswith(b",7"))
+    monkeypatch.setattr(
+        assets._session, "request", lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=response)
+    )
+
+    with pytest.raises(RuntimeError, match="Location ID 7"):
+        multipoint.fetch_epw_multipoint([{"lon": 0.01, "lat": 0, "location": "A"}], 2012, *OPTIONS)
+
+
+def test_fetch_epw_multipoint_rejects_sites_without_a_nearby_location(monkeypatch):
+    # The API left out the second point, so its nearest returned location is ~111 km away
+    response = build_multipoint_csv([(1, 40.0, -105.0)])
+    monkeypatch.setattr(
+        assets._session, "request", lambda _method, url, **_kwargs: DummyResponse(ok=True, url=url, content=response)
+    )
+    sites = [{"lon": -105, "lat": 40, "location": "A"}, {"lon": -105, "lat": 41, "location": "B"}]
+
+    with pytest.raises(RuntimeError, match=r"no location near site B .*Location ID 1, is 111\.2 km away"):
+        multipoint.fetch_epw_multipoint(sites, 2012, *OPTIONS)
+    out = multipoint.fetch_epw_multipoint(sites, 2012, *OPTIONS, max_distance_km=200)
+    assert [weather.headers["LOCATION"][0] for weather in out] == ["A", "B"]
+
+
+def _with_lines(content, replace):
+    lines = content.decode().split("\n")
+    for index, line in replace.items():
+        lines[index] = line
+    return "\n".join(lines).encode()
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        (b"Source,Location ID\nNSRDB,1\n", "timestamp columns"),
+        (b"Source,Location ID\nNSRDB,1\nYear,Month\n2012,1\n", r"no \['Latitude', 'Longitude'\] columns"),
+        (
+            _with_lines(build_multipoint_csv([(1, 0, 0), (2, 0, 1)]), {2: "NSRDB,1,-,-,-,0,1,0,20,-5"}),
+            "repeats a Location ID",
+        ),
+        (
+            build_multipoint_csv([(1, 0, 0), (2, 0, 1)]).replace(b",2\n", b",3\n"),
+            r"unlisted Location IDs \['3'\]",
+        ),
+        (
+            b"\n".join(build_multipoint_csv([(1, 0, 0), (2, 0, 1)]).split(b"\n")[:-2]) + b"\n",
+            "different numbers of data rows",
+        ),
+        (build_multipoint_csv([(1, 0, 0)], rows=0), "No data rows"),
+        (
+            b"\n".join(
+                build_multipoint_csv([(1, 0, 0), (2, 0, 1)]).split(b"\n")[:3] + build_nsrdb_csv().split(b"\n")[2:]
+            ),
+            "no Location ID column",
+        ),
+    ],
+)
+def test_parse_multipoint_response_rejects_malformed_responses(content, message):
+    with pytest.raises(RuntimeError, match=message):
+        multipoint.parse_multipoint_response(content)
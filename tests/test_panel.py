@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from nlr_psm3_2_epw import assets, epw, panel
+
+
+@pytest.fixture
+def epw_files(tmp_path, nsrdb_csv):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"site{i}.epw"
+        assets.convert_csv(nsrdb_csv(rows=24, location_id=i), f"Site{i}", lat=i, lon=-i).write(str(path))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_load_panel_stacks_files_in_order(epw_files, processes):
+    result = panel.load_panel(list(reversed(epw_files)), max_workers=2, processes=processes)
+
+    assert result.paths == list(reversed(epw_files))
+    assert result.data.shape == (4, 24, len(panel.NUMERIC_COLUMNS))
+    assert result.data.dtype == np.float32
+    assert [headers["LOCATION"][0] for headers in result.headers] == ["Site3", "Site2", "Site1", "Site0"]
+    single = epw.EPW()
+    single.read(epw_files[0])
+    expected = single.dataframe[panel.NUMERIC_COLUMNS].to_numpy(dtype=np.float32)
+    assert np.array_equal(result.data[3], expected)
+
+
+def test_load_panel_accepts_glob_and_columns(tmp_path, epw_files):
+    result = panel.load_panel(str(tmp_path / "*.epw"), columns=["Dry Bulb Temperature", "Wind Speed"], dtype="float64")
+
+    assert result.paths == epw_files
+    frame = result.to_frame()
+    assert frame.shape == (96, 2)
+    assert frame.index.names == ["path", "row"]
+    assert frame.loc[(epw_files[1], 0), "Wind Speed"] == result.data[1, 0, 1]
+    # The frame is a view of the stacked array
+    assert np.shares_memory(frame.to_numpy(), result.data)
+
+
+def test_load_panel_enforces_memory_budget(epw_files):
+    columns = ["Dry Bulb Temperature"]
+    assert panel.load_panel(epw_files, columns=columns, memory_budget=4 * 24 * 4).data.nbytes == 384
+
+    with pytest.raises(MemoryError, match="budget of 383"):
+        panel.load_panel(epw_files, columns=columns, memory_budget=383)
+
+
+def test_load_panel_rejects_files_of_different_length(tmp_path, epw_files, nsrdb_csv):
+    short = tmp_path / "short.epw"
+    assets.convert_csv(nsrdb_csv(rows=12), "Short").write(str(short))
+
+    with pytest.raises(ValueError, match="has 12 rows, expected 24"):
+        panel.load_panel(epw_files + [str(short)])
+
+
+@pytest.mark.parametrize(
+    "paths, kwargs, message",
+    [
+        ([], {}, "No epw files"),
+        (None, {"columns": ["Present Weather Codes"]}, "Text columns"),
+        (None, {"max_workers": 0}, "max_workers"),
+    ],
+)
+def test_load_panel_rejects_bad_arguments(epw_files, paths, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        panel.load_panel(epw_files if paths is None else paths, **kwargs)
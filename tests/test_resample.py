@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nlr_psm3_2_epw import resample
+
+
+def _frame(rows_per_hour, hours=2, **columns):
+    rows = rows_per_hour * hours
+    data = {
+        "Year": np.full(rows, 2012),
+        "Month": np.ones(rows, dtype=int),
+        "Day": np.ones(rows, dtype=int),
+        "Hour": np.repeat(np.arange(hours), rows_per_hour),
+        "Minute": np.tile(np.arange(rows_per_hour) * (60 // rows_per_hour), hours),
+    }
+    data.update(columns)
+    return pd.DataFrame(data)
+
+
+def test_rows_per_hour_counts_distinct_minutes():
+    assert resample.rows_per_hour(_frame(12)) == 12
+    assert resample.rows_per_hour(_frame(1)) == 1
+    assert resample.rows_per_hour(_frame(1, hours=0)) == 1
+
+
+def test_to_hourly_aggregates_each_kind_of_column():
+    df = _frame(
+        4,
+        **{
+            "Temperature": [10.0, 11.0, 12.0, 13.0, 20.0, 20.0, 20.0, 20.0],
+            "GHI": [0, 100, 200, 300, 400, 400, 400, 400],
+            "Clearsky DNI": [0, 0, 0, 40, 0, 0, 0, 0],
+            "Wind Direction": [350, 10, 350, 10, 90, 90, 180, 180],
+            "Cloud Type": [1, 3, 3, 1, 7, 7, 0, 2],
+            "Source": ["a", "b", "c", "d", "e", "f", "g", "h"],
+        },
+    )
+
+    hourly = resample.to_hourly(df, 4)
+
+    assert list(hourly.columns) == list(df.columns)
+    assert list(hourly["Minute"]) == [0, 0]
+    assert list(hourly["Temperature"]) == [11.5, 20.0]
+    # W/m2 over four quarter hours integrate to Wh/m2
+    assert list(hourly["GHI"]) == [150.0, 400.0]
+    assert list(hourly["Clearsky DNI"]) == [10.0, 0.0]
+    assert np.allclose(hourly["Wind Direction"], [0.0, 135.0]) or np.allclose(hourly["Wind Direction"], [360.0, 135.0])
+    assert list(hourly["Cloud Type"]) == [1, 7]
+    assert list(hourly["Source"]) == ["a", "e"]
+
+
+def test_to_hourly_conserves_irradiance_energy():
+    ghi = np.random.default_rng(0).uniform(0, 1000, 12 * 24)
+    hourly = resample.to_hourly(_frame(12, hours=24, GHI=ghi), 12)
+
+    # Energy in Wh/m2: each 5-minute record lasts 1/12 of an hour
+    assert np.isclose(hourly["GHI"].sum(), (ghi / 12).sum())
+
+
+@pytest.mark.parametrize("df", [_frame(4).iloc[:-1], _frame(4).iloc[2:6]])
+def test_to_hourly_rejects_partial_hours(df):
+    with pytest.raises(RuntimeError, match="whole hours"):
+        resample.to_hourly(df, 4)
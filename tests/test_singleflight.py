@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from nlr_psm3_2_epw import singleflight
+
+
+def _run_concurrently(flight, key, fn, callers):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def _worker(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as exc:
+            errors[i] = exc
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(flight, key, count):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters == count:
+                return
+        time.sleep(0.001)
+    raise AssertionError("callers did not join the in-flight call")
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def _fn():
+        calls.append(1)
+        release.wait(5)
+        return {"data": 1}
+
+    threads, results, errors = _run_concurrently(flight, "k", _fn, 5)
+    _wait_for_waiters(flight, "k", 4)
+    assert flight.in_flight() == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == [None] * 5
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_shares_errors_and_forgets_key():
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+
+    def _fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    threads, _, errors = _run_concurrently(flight, "k", _fail, 3)
+    _wait_for_waiters(flight, "k", 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert [str(e) for e in errors] == ["boom"] * 3
+    assert all(type(e) is RuntimeError for e in errors)
+    # Every caller raises its own exception object, chained to the one raised by the call
+    assert len({id(e) for e in errors}) == 3
+    original = next(e for e in errors if e.__cause__ is None)
+    assert all(e.__cause__ is original for e in errors if e is not original)
+    # A finished key runs again on the next call
+    assert flight.do("k", lambda: 2) == 2
+
+
+def test_single_flight_runs_different_keys_independently():
+    flight = singleflight.SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    with pytest.raises(ZeroDivisionError):
+        flight.do("c", lambda: 1 / 0)
+
+
+class _Uncopyable(Exception):
+    def __init__(self, code, detail):
+        super().__init__(f"{code}: {detail}")
+
+
+def test_single_flight_wraps_errors_that_cannot_be_copied():
+    error = _Uncopyable(403, "invalid key")
+
+    wrapped = singleflight._waiter_error(error)
+
+    assert isinstance(wrapped, singleflight.SharedCallError)
+    assert str(wrapped) == "_Uncopyable: 403: invalid key"
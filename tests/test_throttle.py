@@ -0,0 +1,237 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from nlr_psm3_2_epw import assets, throttle
+
+
+class _Clock:
+    """A fake monotonic clock whose sleeps advance time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(throttle.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(throttle.time, "sleep", fake.sleep)
+    monkeypatch.setattr(throttle.random, "uniform", lambda low, high: high)
+    return fake
+
+
+class _Response:
+    def __init__(self, status_code, headers=None, content=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.ok = status_code < 400
+        self.url = "https://example.test/data.csv?api_key=secret"
+        self.content = content
+        self.text = ""
+        self.closed = False
+
+    def json(self):
+        return {"errors": ["failed"]}
+
+    def close(self):
+        self.closed = True
+
+
+def _sender(outcomes):
+    calls = []
+
+    def _send():
+        calls.append(None)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return _send, calls
+
+
+def test_token_bucket_admits_bursts_then_paces(clock):
+    bucket = throttle.TokenBucket(rate=2, capacity=2)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits == [0.0, 0.0, 0.5, 0.5]
+    clock.now += 10
+    # Idle time refills the bucket only up to its capacity
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_token_bucket_defer_holds_back_calls(clock):
+    bucket = throttle.TokenBucket(rate=1)
+    bucket.defer(5)
+    assert bucket.acquire() == 5.0
+
+
+def test_rate_limiter_keeps_one_bucket_per_key(clock):
+    limiter = throttle.RateLimiter(rate=1, rates={"fast": 10})
+
+    assert limiter.acquire("slow") == 0.0
+    assert limiter.acquire("slow") == 1.0
+    assert limiter.acquire("fast") == 0.0
+    assert limiter.acquire("fast") == pytest.approx(0.1)
+    assert limiter.bucket("slow") is limiter.bucket("slow")
+
+
+@pytest.mark.parametrize("kwargs", [{"rate": 0}, {"rate": 1, "capacity": 0}])
+def test_token_bucket_rejects_bad_limits(kwargs):
+    with pytest.raises(ValueError):
+        throttle.TokenBucket(**kwargs)
+
+
+def test_retry_after_parses_seconds_and_dates():
+    assert throttle.retry_after(None) is None
+    assert throttle.retry_after("7") == 7.0
+    assert throttle.retry_after("-3") == 0.0
+    assert throttle.retry_after("soon") is None
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 < throttle.retry_after(future) <= 60
+    assert throttle.retry_after("Wed, 21 Oct 2015 07:28:00") == 0.0
+
+
+def test_throttle_retries_server_errors_with_backoff(clock):
+    send, calls = _sender(
+        [requests.exceptions.ConnectionError(), _Response(503), _Response(502, {"Retry-After": "9"}), _Response(200)]
+    )
+    policy = throttle.Throttle(throttle.RateLimiter(rate=1000), max_attempts=5, base_delay=1, max_delay=3)
+
+    assert policy.call("key", send).status_code == 200
+    assert len(calls) == 4
+    assert policy.retries == 3
+    # Full jitter up to the capped exponential backoff, raised to the server's Retry-After
+    assert [s for s in clock.sleeps if s >= 1] == [1.0, 2.0, 9.0]
+
+
+def test_throttle_defers_the_api_key_on_429(clock):
+    responses = [_Response(429, {"Retry-After": "30"}), _Response(429), _Response(200)]
+    send, _calls = _sender(list(responses))
+    limiter = throttle.RateLimiter(rate=1000)
+    policy = throttle.Throttle(limiter, base_delay=2)
+
+    assert policy.call("key", send).status_code == 200
+    # Retried responses release their connection, the returned one stays open for the caller
+    assert [response.closed for response in responses] == [True, True, False]
+    # Both retries waited in the key's bucket, so other workers using the key wait as well
+    assert [s for s in clock.sleeps if s >= 1] == [30.0, 4.0]
+    assert policy.breaker.state == throttle.CircuitBreaker.CLOSED
+
+
+def test_throttle_gives_up_after_max_attempts(clock):
+    policy = throttle.Throttle(throttle.RateLimiter(rate=1000), max_attempts=2)
+
+    send, _ = _sender([_Response(500), _Response(500)])
+    assert policy.call("key", send).status_code == 500
+
+    send, _ = _sender([requests.exceptions.Timeout(), requests.exceptions.Timeout()])
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call("key", send)
+
+    send, calls = _sender([_Response(404)])
+    assert policy.call("key", send).status_code == 404
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        throttle.Throttle(max_attempts=0)
+
+
+def test_circuit_breaker_opens_and_recovers_through_a_probe(clock):
+    breaker = throttle.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.state == breaker.CLOSED
+    breaker.record_failure()
+    assert (breaker.state, breaker.trips) == (breaker.OPEN, 1)
+
+    # Once the reset timeout passed, the first caller probes the upstream
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == breaker.HALF_OPEN
+
+    breaker.record_failure()
+    assert (breaker.state, breaker.trips) == (breaker.OPEN, 2)
+    breaker.record_failure()
+    assert breaker.trips == 2
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+
+    with pytest.raises(ValueError):
+        throttle.CircuitBreaker(failure_threshold=0)
+
+
+def test_circuit_breaker_pauses_all_workers_until_probe_succeeds():
+    breaker = throttle.CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    passed = []
+
+    def _worker():
+        breaker.before_call()
+        passed.append(time.monotonic())
+
+    threads = [threading.Thread(target=_worker) for _ in range(3)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    # One worker becomes the probe, the others stay paused until it reports back
+    deadline = time.monotonic() + 5
+    while not passed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(passed) == 1
+    breaker.record_success()
+    for thread in threads:
+        thread.join()
+
+    assert len(passed) == 3
+    assert min(passed) - start >= 0.04
+
+
+def test_fetch_epw_uses_throttle(monkeypatch, tmp_path, nsrdb_csv, clock):
+    responses = [_Response(503), _Response(200, content=nsrdb_csv(rows=3))]
+    sent = []
+
+    def _fake_request(_method, url, params=None, **_kwargs):
+        sent.append(params["api_key"])
+        return responses.pop(0)
+
+    monkeypatch.setattr(assets._session, "request", _fake_request)
+    policy = throttle.Throttle(throttle.RateLimiter(rate=1000))
+
+    out = assets.fetch_epw(
+        0,
+        0,
+        2012,
+        "Loc",
+        "ghi",
+        "60",
+        "false",
+        "Name",
+        "key",
+        "reason",
+        "aff",
+        "email",
+        "false",
+        "false",
+        throttle=policy,
+    )
+
+    assert out.dataframe.shape == (3, 35)
+    assert sent == ["key", "key"]
+    assert policy.retries == 1
@@ -0,0 +1,138 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from nlr_psm3_2_epw import assets, transport
+
+OPTIONS = ("ghi", "60", "false", "Name", "key", "reason", "aff", "email", "false", "false")
+
+
+@pytest.fixture
+def use_stub(monkeypatch):
+    """Installs a StubTransport that answers every request with the given reply for the duration of a test."""
+    monkeypatch.setattr(assets, "_session", assets._session)
+
+    def _install(reply):
+        stub = transport.StubTransport(lambda _method, _url, _params: reply)
+        assets.set_transport(stub)
+        return stub
+
+    return _install
+
+
+def test_transport_configures_pool_compression_and_timeouts():
+    session = requests.Session()
+    pooled = transport.Transport(
+        max_connections_per_host=64,
+        pools=2,
+        block=True,
+        connect_timeout=3,
+        read_timeout=None,
+        compress=False,
+        session=session,
+    )
+
+    adapter = pooled.session.get_adapter("https://developer.nlr.gov/")
+    assert pooled.session is session
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 64
+    assert adapter._pool_block is True
+    assert session.headers["Accept-Encoding"] == "identity"
+    assert pooled.timeout == (3, None)
+    assert transport.Transport().session.headers["Accept-Encoding"] == "gzip, deflate"
+
+
+@pytest.mark.parametrize("kwargs", [{"max_connections_per_host": 0}, {"pools": 0}])
+def test_transport_rejects_empty_pools(kwargs):
+    with pytest.raises(ValueError, match="at least 1"):
+        transport.Transport(**kwargs)
+
+
+def test_transport_applies_default_timeout(monkeypatch):
+    pooled = transport.Transport(connect_timeout=1, read_timeout=2)
+    calls = []
+    monkeypatch.setattr(pooled.session, "request", lambda method, url, **kwargs: calls.append(kwargs["timeout"]))
+
+    pooled.request("GET", "https://example.invalid/")
+    pooled.request("GET", "https://example.invalid/", timeout=5)
+
+    assert calls == [(1, 2), 5]
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_transport_reuses_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pooled = transport.Transport()
+    try:
+        for _ in range(5):
+            assert pooled.request("GET", f"http://127.0.0.1:{server.server_address[1]}/").content == b"ok"
+    finally:
+        pooled.close()
+        server.shutdown()
+        server.server_close()
+
+    assert len(_KeepAliveHandler.connections) == 1
+
+
+def test_set_transport_returns_previous(monkeypatch):
+    monkeypatch.setattr(assets, "_session", assets._session)
+    current = assets._session
+    stub_transport = transport.StubTransport(lambda *_args: b"")
+
+    assert assets.set_transport(stub_transport) is current
+    assert assets.set_transport(current) is stub_transport
+    stub_transport.close()
+
+
+def test_set_transport_wraps_sessions_with_timeouts(monkeypatch):
+    monkeypatch.setattr(assets, "_session", assets._session)
+    session = requests.Session()
+    calls = []
+    monkeypatch.setattr(session, "request", lambda method, url, **kwargs: calls.append(kwargs["timeout"]))
+
+    assets.set_transport(session)
+    assets._session.request("GET", "https://example.invalid/")
+
+    assert isinstance(assets._session, transport.Transport)
+    assert assets._session.session is session
+    assert calls == [(transport.DEFAULT_CONNECT_TIMEOUT, transport.DEFAULT_READ_TIMEOUT)]
+
+
+def test_stub_transport_serves_downloads(use_stub, tmp_path, nsrdb_csv):
+    stub = use_stub(nsrdb_csv(rows=24))
+
+    buffered = assets.download_epw(0, 0, 2012, "Loc", *OPTIONS, output_dir=str(tmp_path / "buffered"))
+    streamed = assets.stream_epw(0, 0, 2012, "Loc", *OPTIONS, output_dir=str(tmp_path / "streamed"))
+
+    with open(buffered, "rb") as f1, open(streamed, "rb") as f2:
+        assert f1.read() == f2.read()
+    assert [call[1] for call in stub.calls] == [assets.GOES_AGGREGATED_URL] * 2
+    assert stub.calls[0][2]["names"] == 2012
+
+
+@pytest.mark.parametrize("reply", [(503, b"down"), (503, b"down", {"Retry-After": "1"})])
+def test_stub_transport_returns_errors(use_stub, reply):
+    use_stub(reply)
+
+    with pytest.raises(RuntimeError, match=r"NLR request failed \(503\)") as excinfo:
+        assets.fetch_epw(0, 0, 2012, "Loc", *OPTIONS)
+
+    assert "api_key" not in str(excinfo.value)